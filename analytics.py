@@ -0,0 +1,137 @@
+"""점수 통계 분석 (bootstrap 신뢰구간, 베이지안 축소 평균, 추출 변수 격자 집계)
+
+프로세스 풀 작업자가 pickle로 불러올 수 있도록 Streamlit 앱(app.py)과 분리한 모듈.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_SAMPLES = 2000
+CONFIDENCE = 0.95
+DEFAULT_PRIOR_STRENGTH = 5       # 그룹이 적어 추정할 수 없을 때: 전체 평균을 가상 추출 5회로 취급
+PRIOR_STRENGTH_RANGE = (1, 50)
+PARALLEL_MIN_GROUPS = 64         # 그룹이 이보다 적으면 프로세스 풀 없이 계산
+GRID_QUANTILES = (0.01, 0.99)    # 격자 범위: 양 끝 1%는 범위 밖으로 빼서 따로 셈
+GRID_MAX_BINS = 30               # 변수 하나의 칸 수 상한 (넘으면 간격을 넓힘)
+
+
+def bootstrap_interval(scores, samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    """평균의 bootstrap 신뢰구간 (low, high)
+
+    점수는 값 종류가 적으므로(1~5) 기록을 하나씩 뽑는 대신 값별 개수를
+    다항분포로 한 번에 뽑음. 결과는 같고 비용은 기록 수와 무관함.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0:
+        return np.nan, np.nan
+    values, counts = np.unique(scores, return_counts=True)
+    if len(values) == 1:
+        return values[0], values[0]
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(len(scores), counts / len(scores), size=samples)
+    means = draws @ values / len(scores)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return low, high
+
+
+def _group_interval(task):
+    """프로세스 풀 작업 단위: (그룹 키, 점수 배열, 반복 수, 신뢰수준, seed)"""
+    key, scores, samples, confidence, seed = task
+    return key, bootstrap_interval(scores, samples, confidence, seed)
+
+
+def estimate_prior_strength(stats):
+    """그룹 내/그룹 간 분산 비율로 축소 강도(가상 추출 횟수)를 추정 (경험적 베이즈)"""
+    stats = stats[stats['brew_count'] > 1]
+    if len(stats) < 3:
+        return DEFAULT_PRIOR_STRENGTH
+    within = np.average(stats['variance'], weights=stats['brew_count'] - 1)
+    between = stats['mean'].var(ddof=1) - np.mean(within / stats['brew_count'])
+    if between <= 0:
+        return PRIOR_STRENGTH_RANGE[1]
+    return float(np.clip(within / between, *PRIOR_STRENGTH_RANGE))
+
+
+def score_intervals(df, group_col, value_col='overall_score', samples=BOOTSTRAP_SAMPLES,
+                    confidence=CONFIDENCE, prior_strength=None, workers=None, seed=0):
+    """그룹별 추출 횟수, 평균, 축소 평균, bootstrap 신뢰구간 (축소 평균 내림차순)
+
+    축소 평균은 기록이 적은 그룹일수록 전체 평균 쪽으로 당겨서 우연히 높은 점수를 낮춤.
+    그룹이 많으면 프로세스 풀로 나눠 계산하고, 풀을 쓸 수 없으면 순서대로 계산.
+    """
+    columns = [group_col, 'brew_count', 'mean', 'shrunk_mean', 'ci_low', 'ci_high']
+    df = df[[group_col, value_col]].dropna()
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = df.groupby(group_col, observed=True)[value_col]
+    stats = grouped.agg(brew_count='count', mean='mean', variance='var')
+    stats['variance'] = stats['variance'].fillna(0)
+    global_mean = df[value_col].mean()
+    if prior_strength is None:
+        prior_strength = estimate_prior_strength(stats)
+    stats['shrunk_mean'] = ((stats['mean'] * stats['brew_count'] + global_mean * prior_strength)
+                            / (stats['brew_count'] + prior_strength))
+
+    tasks = [(key, scores.to_numpy(), samples, confidence, seed + i)
+             for i, (key, scores) in enumerate(grouped)]
+    intervals = None
+    if len(tasks) >= PARALLEL_MIN_GROUPS and (workers or os.cpu_count() or 1) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                intervals = dict(executor.map(_group_interval, tasks, chunksize=16))
+        except (OSError, RuntimeError):
+            intervals = None  # 프로세스를 만들 수 없는 환경이면 순서대로 계산
+    if intervals is None:
+        intervals = dict(map(_group_interval, tasks))
+
+    stats['ci_low'] = [intervals[key][0] for key in stats.index]
+    stats['ci_high'] = [intervals[key][1] for key in stats.index]
+    stats = stats.reset_index().sort_values('shrunk_mean', ascending=False, ignore_index=True)
+    return stats[columns]
+
+
+def binned_scores(values, scores, bin_widths, quantiles=GRID_QUANTILES, max_bins=GRID_MAX_BINS):
+    """변수 여러 개(열)를 bin_widths 간격으로 나눈 격자에서 칸별 추출 횟수와 점수 합
+
+    np.histogramdd를 개수/점수 합으로 한 번씩만 돌리고, 2차원 그림은 marginal_scores로 합쳐서 만듦.
+    칸 범위는 최솟값/최댓값 대신 분위수로 잡아 잘못 입력한 값 하나가 격자를 키우지 않게 하고,
+    범위 밖 값이 있는 기록은 격자에서 빼고 'outliers'에 개수만 남김.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    edges = []
+    for column, width in zip(values.T, bin_widths):
+        # 실제 값 중에서 고르므로 기록이 적으면 최솟값/최댓값 그대로
+        low = np.quantile(column, quantiles[0], method='lower')
+        high = np.quantile(column, quantiles[1], method='higher')
+        bins = np.floor(high / width) - np.floor(low / width) + 1
+        if bins > max_bins:
+            width = width * np.ceil(bins / max_bins)
+        low = np.floor(low / width) * width
+        high = np.floor(high / width) * width + width
+        edges.append(np.arange(low, high + width / 2, width))
+    inside = np.all([(column >= column_edges[0]) & (column <= column_edges[-1])
+                     for column, column_edges in zip(values.T, edges)], axis=0)
+    counts, edges = np.histogramdd(values[inside], bins=edges)
+    sums, _ = np.histogramdd(values[inside], bins=edges, weights=scores[inside])
+    return {'edges': edges, 'counts': counts, 'sums': sums, 'outliers': int((~inside).sum())}
+
+
+def marginal_scores(grid, keep):
+    """격자를 keep 축만 남기고 합쳐서 (추출 횟수, 평균 점수) 배열을 keep 순서대로 반환"""
+    ndim = grid['counts'].ndim
+    drop = tuple(axis for axis in range(ndim) if axis not in keep)
+    order = [sorted(keep).index(axis) for axis in keep]
+    counts = grid['counts'].sum(axis=drop).transpose(order)
+    sums = grid['sums'].sum(axis=drop).transpose(order)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return counts, means
+
+
+def bin_centers(edges):
+    return (edges[:-1] + edges[1:]) / 2
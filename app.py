@@ -1,23 +1,56 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
-from datetime import datetime, date
+import numpy as np
+from datetime import datetime, date, timedelta, timezone
 import plotly.express as px
 import json
+import hashlib
+import zlib
 import os
+import re
+import uuid
+import threading
+from collections import OrderedDict
+
+import analytics
+
+# DB 연결 (외래 키 제약 조건은 연결마다 켜야 함)
+def get_connection(db_path='coffee_tracker.db', attach_archive=None):
+    """attach_archive=None이면 보관 DB 파일이 있을 때만 archive 스키마로 붙임"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    # ATTACH는 트랜잭션 밖에서만 가능하므로 연결 직후에 처리
+    archive_path = get_archive_path(db_path)
+    if attach_archive or (attach_archive is None and os.path.exists(archive_path)):
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    return conn
+
+# 오래된 추출 기록 보관 DB (coffee_tracker.db -> coffee_tracker_archive.db)
+def get_archive_path(db_path='coffee_tracker.db'):
+    return os.path.splitext(db_path)[0] + '_archive.db'
 
 # JSON 백업/복원 함수들
-def backup_to_json():
-    """현재 데이터를 JSON 파일로 백업"""
+def backup_to_json(force=False):
+    """현재 데이터를 JSON 파일로 백업 (마지막 백업 이후 내용이 그대로면 건너뜀)"""
     try:
-        conn = sqlite3.connect('coffee_tracker.db')
+        conn = get_connection()
+        
+        # 데이터 digest가 마지막 백업과 같으면 다시 쓰지 않음
+        content_digest = get_content_digest(conn.cursor())
+        manifest = read_backup_manifest()
+        if (not force and content_digest and manifest
+                and manifest.get('content_digest') == content_digest
+                and manifest_matches_backup_file(manifest)):
+            conn.close()
+            return True
         
         # 원두 데이터 가져오기
-        beans_df = pd.read_sql_query("SELECT * FROM beans", conn)
+        beans_df = pd.read_sql_query(query_sql('backup_beans'), conn)
         beans_data = beans_df.to_dict('records') if not beans_df.empty else []
         
-        # 추출 기록 데이터 가져오기
-        records_df = pd.read_sql_query("SELECT * FROM brewing_records", conn)
+        # 추출 기록 데이터 가져오기 (보관된 기록 포함)
+        records_df = pd.read_sql_query(query_sql('backup_records', records_source(conn.cursor(), include_archive=True)), conn)
         records_data = records_df.to_dict('records') if not records_df.empty else []
         
         conn.close()
@@ -30,14 +63,161 @@ def backup_to_json():
         }
         
         # data.json 파일로 저장
-        with open('data.json', 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, ensure_ascii=False, indent=2)
+        backup_bytes = json.dumps(backup_data, ensure_ascii=False, indent=2).encode('utf-8')
+        with open('data.json', 'wb') as f:
+            f.write(backup_bytes)
+        
+        # 홈 화면에서 data.json을 열지 않도록 요약 정보(manifest)를 따로 저장
+        manifest = write_backup_manifest(backup_bytes, backup_data["backup_date"], len(beans_data),
+                                         len(records_data), content_digest)
+        
+        # 백업 기록 보관 (바뀐 chunk만 새로 저장)
+        store_backup_generation(backup_bytes, manifest)
         
         return True
     except Exception as e:
         st.error(f"백업 중 오류가 발생했습니다: {str(e)}")
         return False
 
+def write_backup_manifest(backup_bytes, backup_date, beans_count, records_count, content_digest=None):
+    """data.json 옆에 백업 요약(시각, 개수, 크기, 수정 시각, 체크섬)을 data.manifest.json으로 저장"""
+    manifest = {
+        "backup_date": backup_date,
+        "beans": beans_count,
+        "brewing_records": records_count,
+        "size": len(backup_bytes),
+        "mtime_ns": os.stat('data.json').st_mtime_ns,
+        "sha256": hashlib.sha256(backup_bytes).hexdigest(),
+        "content_digest": content_digest
+    }
+    with open('data.manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def read_backup_manifest():
+    """data.manifest.json을 그대로 읽음 (없거나 깨졌으면 None)"""
+    try:
+        with open('data.manifest.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+def manifest_matches_backup_file(manifest):
+    """manifest가 지금의 data.json을 기록한 것인지 (크기가 같아도 내용이 바뀔 수 있어 수정 시각까지 비교)"""
+    if not os.path.exists('data.json'):
+        return False
+    stat = os.stat('data.json')
+    return manifest.get('size') == stat.st_size and manifest.get('mtime_ns') == stat.st_mtime_ns
+
+def get_backup_manifest():
+    """백업 요약 정보 반환 (data.json이 manifest와 다르면 한 번만 다시 읽어 manifest 갱신)"""
+    if not os.path.exists('data.json'):
+        return None
+    
+    manifest = read_backup_manifest()
+    if manifest and manifest_matches_backup_file(manifest):
+        return manifest
+    
+    # manifest가 없거나 오래된 경우 (이전 버전 백업, 다른 곳에서 data.json을 바꾼 경우 등)
+    with open('data.json', 'rb') as f:
+        backup_bytes = f.read()
+    if manifest and manifest.get('sha256') == hashlib.sha256(backup_bytes).hexdigest():
+        # 내용은 그대로이고 수정 시각만 바뀜 (복사 등)
+        content_digest = manifest.get('content_digest')
+    else:
+        content_digest = None
+    backup_data = json.loads(backup_bytes)
+    return write_backup_manifest(backup_bytes, backup_data.get('backup_date', '알 수 없음'),
+                                 len(backup_data.get('beans', [])), len(backup_data.get('brewing_records', [])),
+                                 content_digest)
+
+def read_backup_bytes():
+    """다운로드용 data.json 내용 (다운로드 요청 시에만 호출)"""
+    with open('data.json', 'rb') as f:
+        return f.read()
+
+# 백업 기록 보관소 (내용 기반 chunk 중복 제거)
+# backups/chunks/ab/abcd... : zlib 압축된 chunk, backups/generations/*.json : 백업별 chunk 목록
+BACKUP_HISTORY_DIR = 'backups'
+BACKUP_HISTORY_LIMIT = 200
+
+def _split_backup_chunks(backup_bytes):
+    """줄 내용으로 경계를 정해 나눔 (앞부분이 바뀌어도 뒤쪽 chunk는 그대로 유지됨)"""
+    chunks = []
+    current = []
+    for line in backup_bytes.splitlines(keepends=True):
+        current.append(line)
+        if (zlib.crc32(line) & 0x1F) == 0 or len(current) >= 512:
+            chunks.append(b''.join(current))
+            current = []
+    if current:
+        chunks.append(b''.join(current))
+    return chunks
+
+def _chunk_path(chunk_id):
+    return os.path.join(BACKUP_HISTORY_DIR, 'chunks', chunk_id[:2], chunk_id)
+
+def store_backup_generation(backup_bytes, manifest):
+    """백업 한 세대를 저장 (이미 있는 chunk는 다시 쓰지 않음)"""
+    chunk_ids = []
+    for chunk in _split_backup_chunks(backup_bytes):
+        chunk_id = hashlib.sha256(chunk).hexdigest()
+        path = _chunk_path(chunk_id)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(zlib.compress(chunk))
+            os.replace(path + '.tmp', path)
+        chunk_ids.append(chunk_id)
+    
+    generations_dir = os.path.join(BACKUP_HISTORY_DIR, 'generations')
+    os.makedirs(generations_dir, exist_ok=True)
+    name = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    with open(os.path.join(generations_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+        json.dump({**manifest, "chunks": chunk_ids}, f)
+    
+    prune_backup_generations(BACKUP_HISTORY_LIMIT)
+    return name
+
+def list_backup_generations():
+    """보관된 백업 세대 이름 목록 (최신순)"""
+    generations_dir = os.path.join(BACKUP_HISTORY_DIR, 'generations')
+    if not os.path.isdir(generations_dir):
+        return []
+    return sorted((name[:-5] for name in os.listdir(generations_dir) if name.endswith('.json')), reverse=True)
+
+def read_backup_generation(name):
+    """보관된 백업 세대를 원래 data.json 내용으로 복원"""
+    with open(os.path.join(BACKUP_HISTORY_DIR, 'generations', f'{name}.json'), 'r', encoding='utf-8') as f:
+        generation = json.load(f)
+    chunks = []
+    for chunk_id in generation['chunks']:
+        with open(_chunk_path(chunk_id), 'rb') as f:
+            chunks.append(zlib.decompress(f.read()))
+    backup_bytes = b''.join(chunks)
+    if hashlib.sha256(backup_bytes).hexdigest() != generation['sha256']:
+        raise ValueError(f"백업 기록 {name}의 체크섬이 맞지 않습니다")
+    return backup_bytes
+
+def prune_backup_generations(keep):
+    """오래된 세대를 지우고 더 이상 쓰이지 않는 chunk 정리"""
+    generations = list_backup_generations()
+    if len(generations) <= keep:
+        return
+    generations_dir = os.path.join(BACKUP_HISTORY_DIR, 'generations')
+    for name in generations[keep:]:
+        os.remove(os.path.join(generations_dir, f'{name}.json'))
+    
+    referenced = set()
+    for name in generations[:keep]:
+        with open(os.path.join(generations_dir, f'{name}.json'), 'r', encoding='utf-8') as f:
+            referenced.update(json.load(f)['chunks'])
+    chunks_dir = os.path.join(BACKUP_HISTORY_DIR, 'chunks')
+    for prefix in os.listdir(chunks_dir):
+        for chunk_id in os.listdir(os.path.join(chunks_dir, prefix)):
+            if chunk_id not in referenced:
+                os.remove(os.path.join(chunks_dir, prefix, chunk_id))
+
 def load_from_json():
     """JSON 파일에서 데이터를 로드"""
     try:
@@ -47,40 +227,9 @@ def load_from_json():
         with open('data.json', 'r', encoding='utf-8') as f:
             backup_data = json.load(f)
         
-        conn = sqlite3.connect('coffee_tracker.db')
+        conn = get_connection()
         cursor = conn.cursor()
-        
-        # 기존 데이터 삭제
-        cursor.execute("DELETE FROM brewing_records")
-        cursor.execute("DELETE FROM beans")
-        
-        # 원두 데이터 복원
-        if backup_data.get("beans"):
-            for bean in backup_data["beans"]:
-                cursor.execute('''
-                    INSERT INTO beans (id, name, shop, variety, roast_date, notes, created_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (bean.get('id'), bean.get('name'), bean.get('shop'), 
-                     bean.get('variety'), bean.get('roast_date'), 
-                     bean.get('notes'), bean.get('created_date')))
-        
-        # 추출 기록 데이터 복원
-        if backup_data.get("brewing_records"):
-            for record in backup_data["brewing_records"]:
-                cursor.execute('''
-                    INSERT INTO brewing_records (id, bean_id, brew_date, grind_size, coffee_amount,
-                                               water_amount, water_temp, brew_time, method, equipment,
-                                               adding_water, pour_schedule, taste_score, aroma_score,
-                                               body_score, acidity_score, overall_score, tasting_notes, improvements)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (record.get('id'), record.get('bean_id'), record.get('brew_date'),
-                     record.get('grind_size'), record.get('coffee_amount'), record.get('water_amount'),
-                     record.get('water_temp'), record.get('brew_time'), record.get('method'),
-                     record.get('equipment'), record.get('adding_water'), record.get('pour_schedule'),
-                     record.get('taste_score'), record.get('aroma_score'), record.get('body_score'),
-                     record.get('acidity_score'), record.get('overall_score'), 
-                     record.get('tasting_notes'), record.get('improvements')))
-        
+        restore_backup_data(cursor, backup_data)
         conn.commit()
         conn.close()
         return True
@@ -89,11 +238,976 @@ def load_from_json():
         st.error(f"복원 중 오류가 발생했습니다: {str(e)}")
         return False
 
+def restore_backup_data(cursor, backup_data):
+    """백업 데이터(dict)로 기존 데이터를 전부 교체 (동기화용 uid/updated_at은 유지)"""
+    # 기존 데이터 삭제 (추출 기록과 푸어 단계는 CASCADE로 함께 삭제)
+    cursor.execute("DELETE FROM beans")
+    if has_archive(cursor):
+        # 백업에는 보관된 기록도 들어 있으므로 모두 최근 기록으로 복원
+        cursor.execute("DELETE FROM archive.pour_steps")
+        cursor.execute("DELETE FROM archive.brewing_records")
+        update_archive_stats(cursor)
+    
+    # 원두 데이터 복원
+    if backup_data.get("beans"):
+        for bean in backup_data["beans"]:
+            cursor.execute('''
+                INSERT INTO beans (id, name, shop, variety, roast_date, notes, created_date, uid, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (bean.get('id'), bean.get('name'), bean.get('shop'), 
+                 bean.get('variety'), bean.get('roast_date'), 
+                 bean.get('notes'), bean.get('created_date'),
+                 bean.get('uid'), bean.get('updated_at')))
+    
+    # 추출 기록 데이터 복원 (원두가 없는 기록은 외래 키 위반이므로 제외)
+    restored_bean_ids = {bean.get('id') for bean in backup_data.get("beans") or []}
+    if backup_data.get("brewing_records"):
+        for record in backup_data["brewing_records"]:
+            if record.get('bean_id') not in restored_bean_ids:
+                continue
+            cursor.execute('''
+                INSERT INTO brewing_records (id, bean_id, brew_date, grind_size, coffee_amount,
+                                           water_amount, water_temp, brew_time, method, equipment,
+                                           adding_water, pour_schedule, taste_score, aroma_score,
+                                           body_score, acidity_score, overall_score, tasting_notes, improvements,
+                                           uid, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (record.get('id'), record.get('bean_id'), record.get('brew_date'),
+                 record.get('grind_size'), record.get('coffee_amount'), record.get('water_amount'),
+                 record.get('water_temp'), record.get('brew_time'), record.get('method'),
+                 record.get('equipment'), record.get('adding_water'), record.get('pour_schedule'),
+                 record.get('taste_score'), record.get('aroma_score'), record.get('body_score'),
+                 record.get('acidity_score'), record.get('overall_score'), 
+                 record.get('tasting_notes'), record.get('improvements'),
+                 record.get('uid'), record.get('updated_at')))
+    
+    mark_changed(cursor, 'beans', "1 = 1", keep_updated_at=True, content_uids=True)
+    mark_changed(cursor, 'brewing_records', "1 = 1", keep_updated_at=True, content_uids=True)
+    rebuild_content_digest(cursor)
+    refresh_derived_fields(cursor, "1 = 1")
+    rebuild_daily_rollups(cursor)
+
+# CSV / Parquet 대량 가져오기 (병합 모드)
+# 파일 컬럼명 -> brewing_records 컬럼명 매핑 (소문자/공백 제거 후 비교)
+IMPORT_COLUMN_ALIASES = {
+    'bean_name': ['bean_name', 'bean', 'name', '원두', '원두이름', '원두 이름'],
+    'shop': ['shop', 'store', '구매처'],
+    'variety': ['variety', '품종'],
+    'roast_date': ['roast_date', '로스팅날짜', '로스팅 날짜'],
+    'brew_date': ['brew_date', 'date', '추출날짜', '추출 날짜', '날짜'],
+    'grind_size': ['grind_size', 'grind', '분쇄도'],
+    'coffee_amount': ['coffee_amount', 'dose', '커피양', '커피 양'],
+    'water_amount': ['water_amount', 'water', '물양', '물 양'],
+    'water_temp': ['water_temp', 'temp', 'temperature', '물온도', '물 온도'],
+    'brew_time': ['brew_time', 'time', '추출시간', '추출 시간'],
+    'method': ['method', '추출방법', '추출 방법'],
+    'equipment': ['equipment', '추출도구', '추출 도구'],
+    'adding_water': ['adding_water', 'bypass', '첨수'],
+    'pour_schedule': ['pour_schedule', '푸어스케줄', '푸어 스케줄'],
+    'taste_score': ['taste_score', 'taste', '맛'],
+    'aroma_score': ['aroma_score', 'aroma', '향'],
+    'body_score': ['body_score', 'body', '바디감'],
+    'acidity_score': ['acidity_score', 'acidity', '산미'],
+    'overall_score': ['overall_score', 'overall', 'score', '전체만족도', '전체 만족도'],
+    'tasting_notes': ['tasting_notes', 'notes', '테이스팅노트', '테이스팅 노트'],
+    'improvements': ['improvements', '개선사항'],
+}
+
+IMPORT_RECORD_COLUMNS = ['bean_id', 'brew_date', 'grind_size', 'coffee_amount', 'water_amount',
+                         'water_temp', 'brew_time', 'method', 'equipment', 'adding_water',
+                         'pour_schedule', 'taste_score', 'aroma_score', 'body_score',
+                         'acidity_score', 'overall_score', 'tasting_notes', 'improvements']
+
+def _map_import_columns(columns):
+    """파일의 컬럼명을 brewing_records 스키마 컬럼명으로 매핑"""
+    normalized = {str(col).strip().lower(): col for col in columns}
+    mapping = {}
+    for target, aliases in IMPORT_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in normalized:
+                mapping[normalized[alias.lower()]] = target
+                break
+    return mapping
+
+def _iter_import_chunks(file, file_type, chunk_size):
+    """파일을 chunk 단위로 읽어 (DataFrame, 진행률) 을 순서대로 반환"""
+    if file_type == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet 가져오기에는 pyarrow 패키지가 필요합니다 (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(file)
+        total_rows = parquet_file.metadata.num_rows or 1
+        read_rows = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            read_rows += len(chunk)
+            yield chunk, min(read_rows / total_rows, 1.0)
+    else:
+        total_size = getattr(file, 'size', None)
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            fraction = None
+            if total_size:
+                try:
+                    fraction = min(file.tell() / total_size, 1.0)
+                except (AttributeError, OSError, ValueError):
+                    fraction = None
+            yield chunk, fraction
+
+def normalize_grind_size(values):
+    """숫자 분쇄도는 정수 문자열("24")로, 숫자가 아닌 분쇄도("medium")는 입력 그대로 둠"""
+    grind = pd.to_numeric(values, errors='coerce')
+    return values.astype('string').where(grind.isna(), grind.round().astype('Int64').astype('string'))
+
+def _normalize_import_chunk(chunk, mapping):
+    """chunk를 스키마 컬럼으로 정리하고 자료형을 맞춤"""
+    df = chunk.rename(columns=mapping)[list(mapping.values())]
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df.replace({'': None})
+
+    for col in IMPORT_COLUMN_ALIASES:
+        if col not in df.columns:
+            df[col] = None
+
+    df['bean_name'] = df['bean_name'].astype('string').str.strip()
+    df['shop'] = df['shop'].astype('string').str.strip()
+    df = df[df['bean_name'].notna() & (df['bean_name'] != '')]
+
+    for col in ['brew_date', 'roast_date']:
+        parsed = pd.to_datetime(df[col], errors='coerce')
+        df[col] = parsed.dt.strftime('%Y-%m-%d')
+
+    for col in ['coffee_amount', 'water_amount', 'water_temp', 'adding_water']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    # 점수는 폼과 같은 1-5 범위만 (0-100 척도 등 범위 밖 값은 빈 점수로)
+    for col in ['taste_score', 'aroma_score', 'body_score', 'acidity_score', 'overall_score']:
+        scores = pd.to_numeric(df[col], errors='coerce').round().astype('Int64')
+        df[col] = scores.where(scores.between(1, 5))
+
+    # 메모는 폼처럼 빈 문자열로 저장
+    for col in ['tasting_notes', 'improvements']:
+        df[col] = df[col].astype('string').fillna('')
+
+    # 분쇄도는 기존 기록과 같은 형식("24")으로 저장
+    df['grind_size'] = normalize_grind_size(df['grind_size'])
+
+    return df.astype(object).where(df.notna(), None)
+
+def import_brewing_records(file, file_type='csv', chunk_size=5000, progress_callback=None):
+    """CSV/Parquet 추출 기록을 기존 데이터에 병합
+
+    원두는 (이름, 구매처) 기준으로 찾거나 새로 등록하고, 이미 같은 기록이 있으면 건너뜀.
+    파일은 chunk 단위로 읽고 chunk마다 커밋하므로 대용량 파일도 메모리 사용량이 일정함.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    summary = {'processed': 0, 'inserted': 0, 'skipped': 0, 'new_beans': 0}
+
+    try:
+        # (이름, 구매처) -> bean_id 캐시
+        bean_ids = {(name, shop or ''): bean_id
+                    for bean_id, name, shop in cursor.execute("SELECT id, name, shop FROM beans")}
+
+        cursor.execute(f'''
+            CREATE TEMP TABLE IF NOT EXISTS import_staging (
+                {', '.join(IMPORT_RECORD_COLUMNS)}
+            )
+        ''')
+        placeholders = ', '.join(['?'] * len(IMPORT_RECORD_COLUMNS))
+        columns = ', '.join(IMPORT_RECORD_COLUMNS)
+
+        mapping = None
+        for chunk, fraction in _iter_import_chunks(file, file_type, chunk_size):
+            if mapping is None:
+                mapping = _map_import_columns(chunk.columns)
+                if 'bean_name' not in mapping.values():
+                    raise ValueError("원두 이름 컬럼(bean_name)을 찾을 수 없습니다")
+
+            df = _normalize_import_chunk(chunk, mapping)
+            summary['processed'] += len(chunk)
+
+            # 원두 찾기 또는 새로 등록
+            last_bean_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM beans").fetchone()[0]
+            bean_keys = df[['bean_name', 'shop', 'variety', 'roast_date']].drop_duplicates(subset=['bean_name', 'shop'])
+            for bean in bean_keys.itertuples(index=False):
+                key = (bean.bean_name, bean.shop or '')
+                if key not in bean_ids:
+                    cursor.execute('''
+                        INSERT INTO beans (name, shop, variety, roast_date, notes, created_date)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (bean.bean_name, bean.shop, bean.variety, bean.roast_date, '', date.today()))
+                    bean_ids[key] = cursor.lastrowid
+                    summary['new_beans'] += 1
+
+            df['bean_id'] = [bean_ids[(name, shop or '')] for name, shop in zip(df['bean_name'], df['shop'])]
+
+            cursor.execute("DELETE FROM import_staging")
+            cursor.executemany(f"INSERT INTO import_staging ({columns}) VALUES ({placeholders})",
+                               df[IMPORT_RECORD_COLUMNS].itertuples(index=False, name=None))
+
+            # 이미 있는 기록(같은 원두/날짜/레시피/점수)은 건너뛰고 삽입 (보관된 기록도 확인)
+            archive_dedupe_sql = ''
+            if has_archive(cursor):
+                archive_dedupe_sql = '''
+                AND NOT EXISTS (
+                    SELECT 1 FROM archive.brewing_records br
+                    WHERE br.bean_id = s.bean_id
+                      AND br.brew_date IS s.brew_date
+                      AND br.grind_size IS s.grind_size
+                      AND br.coffee_amount IS s.coffee_amount
+                      AND br.water_temp IS s.water_temp
+                      AND br.brew_time IS s.brew_time
+                      AND br.method IS s.method
+                      AND br.overall_score IS s.overall_score
+                )'''
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM brewing_records").fetchone()[0]
+            cursor.execute(f'''
+                INSERT INTO brewing_records ({columns})
+                SELECT DISTINCT {columns} FROM import_staging s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM brewing_records br
+                    WHERE br.bean_id = s.bean_id
+                      AND br.brew_date IS s.brew_date
+                      AND br.grind_size IS s.grind_size
+                      AND br.coffee_amount IS s.coffee_amount
+                      AND br.water_temp IS s.water_temp
+                      AND br.brew_time IS s.brew_time
+                      AND br.method IS s.method
+                      AND br.overall_score IS s.overall_score
+                ){archive_dedupe_sql}
+            ''')
+            summary['inserted'] += cursor.rowcount
+            summary['skipped'] += len(chunk) - cursor.rowcount
+            mark_changed(cursor, 'beans', "b.uid IS NULL")
+            mark_changed(cursor, 'brewing_records', "br.id > ?", (last_id,))
+            update_content_digest(cursor, 'beans', "b.id > ?", (last_bean_id,))
+            update_content_digest(cursor, 'brewing_records', "br.id > ?", (last_id,))
+            refresh_derived_fields(cursor, "br.id > ?", (last_id,))
+            update_daily_rollups(cursor, "br.id > ?", (last_id,))
+            conn.commit()
+
+            if progress_callback:
+                progress_callback(fraction, summary['processed'], summary['inserted'])
+
+        cursor.execute("DROP TABLE IF EXISTS import_staging")
+        conn.commit()
+    finally:
+        conn.close()
+
+    return summary
+
+# 추출 시간 파싱 ("2'30\"", "4분 30초", "2:30", "150s" 등 -> 초)
+DURATION_TOKEN_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*([^\d\s.,]*)')
+DURATION_UNIT_PATTERNS = [
+    (3600, re.compile(r'(시간|hours?|hrs?|h)')),
+    (60, re.compile(r"(분|minutes?|mins?|m|'|′|’)")),
+    (1, re.compile(r'(초|seconds?|secs?|s|"|″|”)')),
+]
+
+def parse_duration(text):
+    """자유 형식의 시간 문자열을 초 단위 정수로 변환 (해석할 수 없으면 None)"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return None if pd.isna(text) else int(round(text))
+
+    value = str(text).strip().lower()
+    if not value:
+        return None
+
+    # m:ss 또는 h:mm:ss
+    match = re.fullmatch(r'(?:(\d+):)?(\d+):(\d{1,2})', value)
+    if match:
+        hours, minutes, seconds = (int(part) if part else 0 for part in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+
+    # 단위 없는 숫자는 초로 취급
+    if re.fullmatch(r'\d+(?:\.\d+)?', value):
+        return int(round(float(value)))
+
+    total = 0.0
+    found = False
+    last_factor = None
+    for number, unit in DURATION_TOKEN_PATTERN.findall(value):
+        factor = None
+        for unit_factor, pattern in DURATION_UNIT_PATTERNS:
+            if pattern.match(unit):
+                factor = unit_factor
+                break
+        if factor is None and not unit and last_factor in (3600, 60):
+            factor = last_factor // 60  # 2'30 처럼 뒤 단위가 생략된 경우
+        if factor is None:
+            continue
+        total += float(number) * factor
+        found = True
+        last_factor = factor
+
+    return int(round(total)) if found else None
+
+def format_duration(seconds):
+    """초를 m:ss 형식 문자열로 변환"""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+# 추출 기록의 파생 컬럼 계산 (삽입/복원 직후 같은 트랜잭션에서 호출)
+def refresh_derived_fields(cursor, where, params=()):
+    """조건에 맞는 추출 기록의 파생 컬럼을 다시 계산
+
+    - days_off_roast: 로스팅 후 경과일
+    - brew_time_seconds: 총 추출 시간(초)
+    - pour_steps: 푸어 단계별 물량과 시작 시간(초)
+    """
+    cursor.connection.create_function('parse_duration', 1, parse_duration, deterministic=True)
+    # 원두의 로스팅 날짜가 바뀌면 보관된 기록의 경과일도 바뀌므로 보관 DB도 같이 갱신
+    schemas = ['main', 'archive'] if has_archive(cursor) else ['main']
+    for schema in schemas:
+        cursor.execute(f'''
+            UPDATE {schema}.brewing_records AS br
+            SET days_off_roast = (
+                    SELECT CAST(julianday(br.brew_date) - julianday(b.roast_date) AS INTEGER)
+                    FROM main.beans b WHERE b.id = br.bean_id
+                ),
+                brew_time_seconds = parse_duration(br.brew_time)
+            WHERE {where}
+        ''', params)
+        cursor.execute(f"DELETE FROM {schema}.pour_steps WHERE record_id IN "
+                       f"(SELECT br.id FROM {schema}.brewing_records br WHERE {where})", params)
+        cursor.execute(f'''
+            INSERT INTO {schema}.pour_steps (record_id, step, water_amount, offset_seconds)
+            SELECT br.id, CAST(j.key AS INTEGER),
+                   json_extract(j.value, '$.water_amount'),
+                   parse_duration(json_extract(j.value, '$.time'))
+            FROM {schema}.brewing_records br,
+                 json_each(CASE WHEN json_valid(br.pour_schedule) THEN br.pour_schedule ELSE '[]' END) j
+            WHERE {where}
+        ''', params)
+
+# 로스팅 후 경과일 구간 (시작일, 표시 이름)
+FRESHNESS_BUCKETS = [(0, '0-3일'), (4, '4-7일'), (8, '8-14일'), (15, '15-21일'), (22, '22-30일'), (31, '31일+')]
+
+# 일별 집계(rollup) 테이블 관리
+# 추출 기록의 Brewing Ratio: (푸어 물량 합계 + 첨수) / 커피량, 푸어 스케줄이 없으면 NULL
+BREWING_RATIO_SQL = '''
+    CASE WHEN br.coffee_amount > 0 AND json_valid(br.pour_schedule) THEN
+        ((SELECT TOTAL(json_extract(value, '$.water_amount')) FROM json_each(br.pour_schedule))
+         + COALESCE(br.adding_water, 0)) / br.coffee_amount
+    END
+'''
+
+def update_daily_rollups(cursor, where, params=(), sign=1, source='brewing_records'):
+    """조건에 맞는 추출 기록을 daily_rollups에 더하거나(sign=1) 뺌(sign=-1)
+
+    삽입 직후 또는 삭제 직전에 같은 커서(트랜잭션) 안에서 호출해야 함.
+    """
+    sign = 1 if sign >= 0 else -1
+    cursor.execute(f'''
+        INSERT INTO daily_rollups (brew_date, bean_id, method, equipment, brew_count, scored_count,
+                                   taste_sum, aroma_sum, body_sum, acidity_sum, overall_sum,
+                                   taste_count, aroma_count, body_count, acidity_count,
+                                   ratio_sum, ratio_count)
+        SELECT COALESCE(br.brew_date, ''), br.bean_id, COALESCE(br.method, ''), COALESCE(br.equipment, ''),
+               {sign} * COUNT(*), {sign} * COUNT(br.overall_score),
+               {sign} * TOTAL(br.taste_score), {sign} * TOTAL(br.aroma_score), {sign} * TOTAL(br.body_score),
+               {sign} * TOTAL(br.acidity_score), {sign} * TOTAL(br.overall_score),
+               {sign} * COUNT(br.taste_score), {sign} * COUNT(br.aroma_score), {sign} * COUNT(br.body_score),
+               {sign} * COUNT(br.acidity_score),
+               {sign} * TOTAL({BREWING_RATIO_SQL}), {sign} * COUNT({BREWING_RATIO_SQL})
+        FROM {source} br
+        WHERE {where}
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (brew_date, bean_id, method, equipment) DO UPDATE SET
+            brew_count = brew_count + excluded.brew_count,
+            scored_count = scored_count + excluded.scored_count,
+            taste_sum = taste_sum + excluded.taste_sum,
+            aroma_sum = aroma_sum + excluded.aroma_sum,
+            body_sum = body_sum + excluded.body_sum,
+            acidity_sum = acidity_sum + excluded.acidity_sum,
+            overall_sum = overall_sum + excluded.overall_sum,
+            taste_count = taste_count + excluded.taste_count,
+            aroma_count = aroma_count + excluded.aroma_count,
+            body_count = body_count + excluded.body_count,
+            acidity_count = acidity_count + excluded.acidity_count,
+            ratio_sum = ratio_sum + excluded.ratio_sum,
+            ratio_count = ratio_count + excluded.ratio_count
+    ''', params)
+    # 만족도 값별 기록 수 (만족도 분포 차트용)
+    cursor.execute(f'''
+        INSERT INTO score_rollups (overall_score, brew_count)
+        SELECT br.overall_score, {sign} * COUNT(*)
+        FROM {source} br
+        WHERE br.overall_score IS NOT NULL AND ({where})
+        GROUP BY br.overall_score
+        ON CONFLICT (overall_score) DO UPDATE SET brew_count = brew_count + excluded.brew_count
+    ''', params)
+    if sign < 0:
+        cursor.execute("DELETE FROM daily_rollups WHERE brew_count <= 0")
+        cursor.execute("DELETE FROM score_rollups WHERE brew_count <= 0")
+    # 바뀐 원두의 원두별 요약도 다시 계산
+    cursor.execute(f"SELECT DISTINCT br.bean_id FROM {source} br WHERE {where}", params)
+    refresh_bean_rollups(cursor, [row[0] for row in cursor.fetchall()])
+
+def refresh_bean_rollups(cursor, bean_ids=None):
+    """원두별 추출 횟수/평균 만족도/마지막 추출일을 daily_rollups에서 다시 계산 (None이면 전체 원두)
+
+    원두 하나당 bean_rollups 한 행 (추출 기록이 없으면 0/NULL), 홈 화면 정렬용.
+    """
+    where, params = "1 = 1", ()
+    if bean_ids is not None:
+        if not bean_ids:
+            return
+        where, params = "b.id IN (SELECT value FROM json_each(?))", (json.dumps([int(bean_id) for bean_id in bean_ids]),)
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO bean_rollups (bean_id, brew_count, scored_count, overall_sum, overall_score, last_brew_date)
+        SELECT b.id, COALESCE(SUM(r.brew_count), 0), COALESCE(SUM(r.scored_count), 0), TOTAL(r.overall_sum),
+               SUM(r.overall_sum) / NULLIF(SUM(r.scored_count), 0), MAX(NULLIF(r.brew_date, ''))
+        FROM beans b
+        LEFT JOIN daily_rollups r ON r.bean_id = b.id
+        WHERE {where}
+        GROUP BY b.id
+    ''', params)
+
+def rebuild_daily_rollups(cursor):
+    """daily_rollups를 전체 추출 기록(보관된 기록 포함)에서 한 번에 다시 계산"""
+    cursor.execute("DELETE FROM daily_rollups")
+    cursor.execute("DELETE FROM score_rollups")
+    update_daily_rollups(cursor, "1 = 1")
+    if has_archive(cursor):
+        update_daily_rollups(cursor, "1 = 1", source='archive.brewing_records')
+
+# 변경 추적 (기기 간 동기화용)
+# 각 DB는 sync_meta에 device_id와 row_version 카운터를 가지고,
+# 원두/추출 기록을 쓸 때마다 uid, updated_at, row_version을 갱신함
+SYNC_TABLE_ALIASES = {'beans': 'b', 'brewing_records': 'br'}
+SYNC_BEAN_COLUMNS = ['name', 'shop', 'variety', 'roast_date', 'notes', 'created_date']
+SYNC_RECORD_COLUMNS = [col for col in IMPORT_RECORD_COLUMNS if col != 'bean_id']
+# uid 없이 복원/마이그레이션한 행의 uid 기준 컬럼 (같은 백업에서 복원한 기기끼리 같은 uid가 됨)
+SYNC_UID_COLUMNS = {
+    'beans': ['id'] + SYNC_BEAN_COLUMNS,
+    'brewing_records': ['id', 'bean_id'] + SYNC_RECORD_COLUMNS,
+}
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def next_row_version(cursor):
+    """이 DB의 row_version 카운터를 하나 올리고 새 값을 반환"""
+    cursor.execute("UPDATE sync_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'row_version'")
+    cursor.execute("SELECT CAST(value AS INTEGER) FROM sync_meta WHERE key = 'row_version'")
+    return cursor.fetchone()[0]
+
+def get_device_id(cursor):
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'device_id'")
+    return cursor.fetchone()[0]
+
+def assign_missing_uids(cursor, table, where, params=(), content_uids=False):
+    """uid가 없는 행에 uid를 발급 (새 행은 무작위 uuid4)
+
+    content_uids이면 id와 내용의 sha256으로 정함 (uid가 없던 예전 DB/백업을 마이그레이션/복원할 때만).
+    무작위 uid를 쓰면 같은 data.json에서 복원한 두 기기가 같은 행에 다른 uid를 갖게 되어
+    첫 동기화 때 모든 행이 중복됨. 새로 쓰는 행은 두 기기에서 id와 내용이 같아도 다른 추출이므로 무작위로 발급.
+    """
+    alias = SYNC_TABLE_ALIASES[table]
+    columns = ', '.join(f'{alias}.{col}' for col in SYNC_UID_COLUMNS[table])
+    cursor.execute(f"SELECT {columns} FROM {table} {alias} WHERE {alias}.uid IS NULL AND ({where})", params)
+    uids = []
+    for row in cursor.fetchall():
+        if content_uids:
+            payload = json.dumps([table] + list(row), ensure_ascii=False, default=str)
+            uids.append((hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32], row[0]))
+        else:
+            uids.append((uuid.uuid4().hex, row[0]))
+    cursor.executemany(f"UPDATE {table} SET uid = ? WHERE id = ?", uids)
+
+def mark_changed(cursor, table, where, params=(), keep_updated_at=False, content_uids=False):
+    """조건에 맞는 행을 변경됨으로 표시 (uid가 없으면 새로 발급, content_uids는 assign_missing_uids 참고)"""
+    assign_missing_uids(cursor, table, where, params, content_uids)
+    alias = SYNC_TABLE_ALIASES[table]
+    updated_at_sql = f"COALESCE({alias}.updated_at, :now)" if keep_updated_at else ":now"
+    named_params = {f'p{i}': value for i, value in enumerate(params)}
+    where_sql = where
+    for i in range(len(params)):
+        where_sql = where_sql.replace('?', f':p{i}', 1)
+    cursor.execute(f'''
+        UPDATE {table} AS {alias}
+        SET updated_at = {updated_at_sql},
+            row_version = :version
+        WHERE {where_sql}
+    ''', {**named_params, 'now': _utc_now(), 'version': next_row_version(cursor)})
+
+def record_tombstones(cursor, table, where, params=()):
+    """삭제할 행의 uid를 tombstones에 남겨 다른 기기에도 삭제가 전달되게 함"""
+    alias = SYNC_TABLE_ALIASES[table]
+    version = next_row_version(cursor)
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO tombstones (table_name, uid, deleted_at, row_version)
+        SELECT '{table}', {alias}.uid, ?, ?
+        FROM {table} {alias}
+        WHERE {alias}.uid IS NOT NULL AND ({where})
+    ''', (_utc_now(), version, *params))
+
+def prepare_records_delete(cursor, where, params=(), tombstone=True):
+    """삭제될 추출 기록의 삭제 기록/집계/digest를 먼저 정리 (실제 삭제 직전에 호출)"""
+    if tombstone:
+        record_tombstones(cursor, 'brewing_records', where, params)
+    update_daily_rollups(cursor, where, params, sign=-1)
+    update_content_digest(cursor, 'brewing_records', where, params)
+
+def delete_records_where(cursor, where, params=(), tombstone=True):
+    """추출 기록 삭제 (푸어 단계는 ON DELETE CASCADE로 함께 삭제)"""
+    restore_archived_records(cursor, where, params)
+    prepare_records_delete(cursor, where, params, tombstone)
+    cursor.execute(f"DELETE FROM brewing_records AS br WHERE {where}", params)
+    return cursor.rowcount
+
+def delete_beans_where(cursor, where, params=(), tombstone=True):
+    """원두 삭제 (추출 기록과 푸어 단계는 ON DELETE CASCADE로 함께 삭제)"""
+    records_where = f"br.bean_id IN (SELECT b.id FROM beans b WHERE {where})"
+    restore_archived_records(cursor, records_where, params)
+    prepare_records_delete(cursor, records_where, params, tombstone)
+    if tombstone:
+        record_tombstones(cursor, 'beans', where, params)
+    update_content_digest(cursor, 'beans', where, params)
+    cursor.execute(f"DELETE FROM beans AS b WHERE {where}", params)
+    return cursor.rowcount
+
+def _row_sort_key(row, columns):
+    """충돌 시 비교 기준: updated_at이 늦은 쪽, 같으면 내용(JSON) 비교로 결정"""
+    return (row['updated_at'] or '', json.dumps([row[col] for col in columns], ensure_ascii=False, default=str))
+
+def get_sync_changes(cursor, since_version):
+    """since_version 이후 변경된 원두/추출 기록/삭제 기록을 반환"""
+    cursor.row_factory = sqlite3.Row
+    bean_cols = ', '.join(f'b.{col}' for col in SYNC_BEAN_COLUMNS)
+    record_cols = ', '.join(f'br.{col}' for col in SYNC_RECORD_COLUMNS)
+    changes = {
+        'beans': [dict(row) for row in cursor.execute(f'''
+            SELECT b.uid, b.updated_at, {bean_cols}
+            FROM beans b WHERE b.row_version > ?
+        ''', (since_version,))],
+        'brewing_records': [dict(row) for row in cursor.execute(f'''
+            SELECT br.uid, br.updated_at, b.uid AS bean_uid, {record_cols}
+            FROM {records_source(cursor, include_archive=True)} br JOIN beans b ON br.bean_id = b.id
+            WHERE br.row_version > ?
+        ''', (since_version,))],
+        'tombstones': [dict(row) for row in cursor.execute('''
+            SELECT table_name, uid, deleted_at FROM tombstones WHERE row_version > ?
+        ''', (since_version,))],
+    }
+    cursor.row_factory = None
+    return changes
+
+def _upsert_synced_row(cursor, table, row, columns, extra=None):
+    """동기화로 받은 행을 uid 기준으로 삽입/갱신, 반영된 행의 id를 반환 (반영 안 하면 None)"""
+    alias = SYNC_TABLE_ALIASES[table]
+    values = {col: row[col] for col in columns}
+    values.update(extra or {})
+    all_columns = list(values)
+
+    select_sql = f"SELECT id, updated_at, {', '.join(columns)} FROM {{}} WHERE uid = ?"
+    cursor.execute(select_sql.format(table), (row['uid'],))
+    existing = cursor.fetchone()
+    archived = False
+    if existing is None and table == 'brewing_records' and has_archive(cursor):
+        cursor.execute(select_sql.format('archive.brewing_records'), (row['uid'],))
+        existing = cursor.fetchone()
+        archived = existing is not None
+    if existing:
+        current = dict(zip(['id', 'updated_at'] + columns, existing))
+        if _row_sort_key(row, columns) <= _row_sort_key(current, columns):
+            return None
+        if archived:
+            # 보관된 기록이 바뀌면 최근 기록으로 되돌린 뒤 수정
+            restore_archived_records(cursor, "br.id = ?", (current['id'],))
+        if table == 'brewing_records':
+            update_daily_rollups(cursor, "br.id = ?", (current['id'],), sign=-1)
+        update_content_digest(cursor, table, f"{alias}.id = ?", (current['id'],))
+        set_sql = ', '.join(f"{col} = ?" for col in all_columns)
+        cursor.execute(f"UPDATE {table} SET {set_sql}, updated_at = ?, row_version = ? WHERE id = ?",
+                       (*values.values(), row['updated_at'], next_row_version(cursor), current['id']))
+        update_content_digest(cursor, table, f"{alias}.id = ?", (current['id'],))
+        return current['id']
+
+    cursor.execute("SELECT deleted_at FROM tombstones WHERE table_name = ? AND uid = ?", (table, row['uid']))
+    tombstone = cursor.fetchone()
+    if tombstone and tombstone[0] >= (row['updated_at'] or ''):
+        return None  # 이쪽에서 더 나중에 삭제됨
+    cursor.execute("DELETE FROM tombstones WHERE table_name = ? AND uid = ?", (table, row['uid']))
+    placeholders = ', '.join(['?'] * (len(all_columns) + 3))
+    cursor.execute(f"INSERT INTO {table} ({', '.join(all_columns)}, uid, updated_at, row_version) VALUES ({placeholders})",
+                   (*values.values(), row['uid'], row['updated_at'], next_row_version(cursor)))
+    row_id = cursor.lastrowid
+    update_content_digest(cursor, table, f"{alias}.id = ?", (row_id,))
+    return row_id
+
+def apply_sync_changes(cursor, changes):
+    """다른 DB의 변경분을 이 DB에 반영 (충돌은 updated_at이 늦은 쪽, 삭제는 같은 시각이면 삭제 우선)"""
+    summary = {'beans': 0, 'brewing_records': 0, 'deleted': 0}
+
+    for bean in changes['beans']:
+        bean_id = _upsert_synced_row(cursor, 'beans', bean, SYNC_BEAN_COLUMNS)
+        if bean_id is not None:
+            refresh_derived_fields(cursor, "br.bean_id = ?", (bean_id,))
+            summary['beans'] += 1
+
+    for record in changes['brewing_records']:
+        cursor.execute("SELECT id FROM beans WHERE uid = ?", (record['bean_uid'],))
+        bean = cursor.fetchone()
+        if bean is None:
+            continue  # 원두가 이쪽에서 삭제됨
+        record_id = _upsert_synced_row(cursor, 'brewing_records', record, SYNC_RECORD_COLUMNS, {'bean_id': bean[0]})
+        if record_id is not None:
+            refresh_derived_fields(cursor, "br.id = ?", (record_id,))
+            update_daily_rollups(cursor, "br.id = ?", (record_id,))
+            summary['brewing_records'] += 1
+
+    for tombstone in changes['tombstones']:
+        table, uid, deleted_at = tombstone['table_name'], tombstone['uid'], tombstone['deleted_at']
+        alias = SYNC_TABLE_ALIASES[table]
+        if table == 'brewing_records':
+            restore_archived_records(cursor, "br.uid = ? AND br.updated_at <= ?", (uid, deleted_at))
+        cursor.execute(f"SELECT id FROM {table} {alias} WHERE {alias}.uid = ? AND {alias}.updated_at <= ?", (uid, deleted_at))
+        row = cursor.fetchone()
+        if row:
+            if table == 'beans':
+                delete_beans_where(cursor, "b.id = ?", (row[0],), tombstone=False)
+            else:
+                delete_records_where(cursor, "br.id = ?", (row[0],), tombstone=False)
+            summary['deleted'] += 1
+        cursor.execute('''
+            INSERT INTO tombstones (table_name, uid, deleted_at, row_version) VALUES (?, ?, ?, ?)
+            ON CONFLICT (table_name, uid) DO UPDATE SET deleted_at = MAX(deleted_at, excluded.deleted_at)
+        ''', (table, uid, deleted_at, next_row_version(cursor)))
+
+    return summary
+
+def _get_sync_watermark(cursor, peer_device_id):
+    cursor.execute("SELECT last_version FROM sync_state WHERE peer_device_id = ?", (peer_device_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def _set_sync_watermark(cursor, peer_device_id, version):
+    cursor.execute('''
+        INSERT INTO sync_state (peer_device_id, last_version, synced_at) VALUES (?, ?, ?)
+        ON CONFLICT (peer_device_id) DO UPDATE SET last_version = excluded.last_version, synced_at = excluded.synced_at
+    ''', (peer_device_id, version, _utc_now()))
+
+def sync_databases(peer_path, db_path='coffee_tracker.db'):
+    """두 로컬 DB 사이에서 마지막 동기화 이후 변경된 행만 양방향으로 교환"""
+    local_conn = get_connection(db_path)
+    peer_conn = get_connection(peer_path)
+    try:
+        local, peer = local_conn.cursor(), peer_conn.cursor()
+        for cursor in (local, peer):
+            migrate_database(cursor)
+        local_id, peer_id = get_device_id(local), get_device_id(peer)
+        if local_id == peer_id:
+            raise ValueError("같은 데이터베이스끼리는 동기화할 수 없습니다")
+
+        # 양쪽 변경분을 먼저 모은 뒤 서로 반영
+        local_changes = get_sync_changes(local, _get_sync_watermark(peer, local_id))
+        peer_changes = get_sync_changes(peer, _get_sync_watermark(local, peer_id))
+        received = apply_sync_changes(local, peer_changes)
+        sent = apply_sync_changes(peer, local_changes)
+
+        # 반영 후의 버전까지 서로 본 것으로 기록 (방금 받은 행이 되돌아가지 않도록)
+        _set_sync_watermark(peer, local_id, next_row_version(local))
+        _set_sync_watermark(local, peer_id, next_row_version(peer))
+        peer_conn.commit()
+        local_conn.commit()
+    finally:
+        local_conn.close()
+        peer_conn.close()
+
+    return {'sent': sent, 'received': received}
+
+# 백업용 데이터 digest (변경이 없으면 백업을 건너뛰기 위함)
+# 각 행 내용의 sha256을 XOR로 합친 값이라 행을 넣을 때/뺄 때 같은 연산으로 갱신 가능
+DIGEST_COLUMNS = {
+    'beans': ['id', 'uid', 'updated_at'] + SYNC_BEAN_COLUMNS,
+    'brewing_records': ['id', 'bean_id', 'uid', 'updated_at'] + SYNC_RECORD_COLUMNS,
+}
+
+def _rows_digest(table, rows):
+    digest = 0
+    for row in rows:
+        payload = json.dumps([table] + list(row), ensure_ascii=False, default=str)
+        digest ^= int.from_bytes(hashlib.sha256(payload.encode('utf-8')).digest(), 'big')
+    return digest
+
+def get_content_digest(cursor):
+    """현재 원두/추출 기록 내용의 digest (hex 문자열)"""
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'content_digest'")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def update_content_digest(cursor, table, where, params=(), source=None):
+    """조건에 맞는 행을 digest에 XOR (삽입 직후, 삭제 직전, 수정 전후에 호출)"""
+    alias = SYNC_TABLE_ALIASES[table]
+    columns = ', '.join(f'{alias}.{col}' for col in DIGEST_COLUMNS[table])
+    cursor.execute(f"SELECT {columns} FROM {source or table} {alias} WHERE {where}", params)
+    rows_digest = _rows_digest(table, cursor.fetchall())
+    if rows_digest:
+        current = int(get_content_digest(cursor) or '0', 16)
+        cursor.execute("UPDATE sync_meta SET value = ? WHERE key = 'content_digest'",
+                       (f"{current ^ rows_digest:064x}",))
+
+def rebuild_content_digest(cursor):
+    """digest를 전체 데이터에서 다시 계산"""
+    cursor.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('content_digest', ?)", (f"{0:064x}",))
+    update_content_digest(cursor, 'beans', "1 = 1")
+    update_content_digest(cursor, 'brewing_records', "1 = 1")
+    if has_archive(cursor):
+        update_content_digest(cursor, 'brewing_records', "1 = 1", source='archive.brewing_records')
+
+# 보관 DB (hot/cold 분리)
+# 오래된 추출 기록은 archive 스키마(별도 파일)로 옮겨 평소 조회는 최근 기록만 훑도록 함.
+# 보관해도 기록 내용은 그대로이므로 daily_rollups, content digest, 백업, 동기화에는 계속 포함됨
+ARCHIVE_DEFAULT_MAX_AGE_DAYS = 365
+
+def _archive_attached(cursor):
+    cursor.execute("PRAGMA database_list")
+    return 'archive' in [row[1] for row in cursor.fetchall()]
+
+def has_archive(cursor):
+    """보관 DB가 연결되어 있고 보관 테이블이 있는지"""
+    if not _archive_attached(cursor):
+        return False
+    cursor.execute(query_sql('archive_tables'))
+    return cursor.fetchone()[0] == 2
+
+def _table_columns(cursor, table, schema='main'):
+    cursor.execute(f"PRAGMA {schema}.table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def ensure_archive_schema(cursor):
+    """보관 테이블을 main 테이블과 같은 컬럼으로 맞춤 (외래 키 없음, main에 새 컬럼이 생기면 추가)"""
+    for table, key_sql in (('brewing_records', None), ('pour_steps', 'PRIMARY KEY (record_id, step)')):
+        cursor.execute(f"PRAGMA main.table_info({table})")
+        main_columns = [(row[1], row[2]) for row in cursor.fetchall()]
+        archive_columns = set(_table_columns(cursor, table, 'archive'))
+        if not archive_columns:
+            column_defs = ["id INTEGER PRIMARY KEY" if name == 'id' else f"{name} {col_type}".strip()
+                           for name, col_type in main_columns]
+            if key_sql:
+                column_defs.append(key_sql)
+            cursor.execute(f"CREATE TABLE archive.{table} ({', '.join(column_defs)})")
+        else:
+            for name, col_type in main_columns:
+                if name not in archive_columns:
+                    cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {col_type}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_records_bean_date ON brewing_records (bean_id, brew_date)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_archive_records_uid ON brewing_records (uid)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_records_row_version ON brewing_records (row_version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_records_brew_date ON brewing_records (brew_date)")
+    # 보관 DB 요약이 없으면 (이전 버전에서 만든 보관 DB) 한 번만 전체를 셈
+    if read_archive_stats(cursor) is None:
+        update_archive_stats(cursor)
+
+def read_archive_stats(cursor):
+    """sync_meta에 기록한 보관 DB 요약 {'generation', 'count', 'first_date', 'last_date'} (없으면 None)"""
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'archive_stats'")
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+def update_archive_stats(cursor, count_change=None):
+    """보관 DB를 바꾼 뒤 요약을 갱신하고 세대 번호를 올림 (count_change가 None이면 개수를 다시 셈)
+
+    데이터 버전과 보관 요약은 매 화면마다 읽으므로 보관 DB를 세지 않고 이 값을 씀.
+    날짜 범위는 brew_date 인덱스의 양 끝만 읽음.
+    """
+    stats = read_archive_stats(cursor) or {'generation': 0, 'count': 0}
+    if count_change is None:
+        cursor.execute(query_sql('archive_count'))
+        stats['count'] = cursor.fetchone()[0]
+    else:
+        stats['count'] += count_change
+    cursor.execute(query_sql('archive_date_range'))
+    stats['first_date'], stats['last_date'] = cursor.fetchone()
+    stats['generation'] += 1
+    cursor.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('archive_stats', ?)", (json.dumps(stats),))
+
+def records_source(cursor, include_archive=False):
+    """추출 기록을 읽을 FROM 대상 (include_archive이면 보관된 기록까지 UNION ALL)"""
+    if not include_archive or not has_archive(cursor):
+        return 'brewing_records'
+    columns = ', '.join(_table_columns(cursor, 'brewing_records'))
+    return f"(SELECT {columns} FROM main.brewing_records UNION ALL SELECT {columns} FROM archive.brewing_records)"
+
+def _move_records(cursor, source, target, where, params=()):
+    """조건에 맞는 추출 기록과 푸어 단계를 source에서 target 스키마로 옮김 (id, uid 등은 그대로)"""
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS moving_records (id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM moving_records")
+    cursor.execute(f"INSERT INTO moving_records SELECT br.id FROM {source}.brewing_records br WHERE {where}", params)
+    moved = cursor.rowcount
+    if moved:
+        record_cols = ', '.join(_table_columns(cursor, 'brewing_records'))
+        step_cols = ', '.join(_table_columns(cursor, 'pour_steps'))
+        cursor.execute(f'''
+            INSERT INTO {target}.brewing_records ({record_cols})
+            SELECT {record_cols} FROM {source}.brewing_records WHERE id IN (SELECT id FROM moving_records)
+        ''')
+        cursor.execute(f'''
+            INSERT INTO {target}.pour_steps ({step_cols})
+            SELECT {step_cols} FROM {source}.pour_steps WHERE record_id IN (SELECT id FROM moving_records)
+        ''')
+        # main의 푸어 단계는 CASCADE로 함께 삭제됨
+        if source == 'archive':
+            cursor.execute("DELETE FROM archive.pour_steps WHERE record_id IN (SELECT id FROM moving_records)")
+        cursor.execute(f"DELETE FROM {source}.brewing_records WHERE id IN (SELECT id FROM moving_records)")
+        update_archive_stats(cursor, moved if target == 'archive' else -moved)
+    return moved
+
+def restore_archived_records(cursor, where, params=()):
+    """조건에 맞는 보관된 기록을 최근 기록으로 되돌림 (수정/삭제/동기화 전에 호출)"""
+    if not has_archive(cursor):
+        return 0
+    return _move_records(cursor, 'archive', 'main', where, params)
+
+def get_archive_max_age(cursor):
+    """자동 보관 기준 일수 (설정하지 않았으면 None)"""
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'archive_max_age_days'")
+    row = cursor.fetchone()
+    return int(row[0]) if row else None
+
+def set_archive_max_age(max_age_days):
+    """자동 보관 기준 일수 저장 (None이면 자동 보관 끔)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    if max_age_days is None:
+        cursor.execute("DELETE FROM sync_meta WHERE key = 'archive_max_age_days'")
+    else:
+        cursor.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('archive_max_age_days', ?)", (str(int(max_age_days)),))
+    conn.commit()
+    conn.close()
+
+def archive_old_records(max_age_days, db_path='coffee_tracker.db'):
+    """max_age_days일보다 오래된 추출 기록을 보관 DB로 옮기고 옮긴 개수를 반환"""
+    cutoff = (date.today() - timedelta(days=int(max_age_days))).isoformat()
+    conn = get_connection(db_path, attach_archive=True)
+    cursor = conn.cursor()
+    try:
+        ensure_archive_schema(cursor)
+        moved = _move_records(cursor, 'main', 'archive', "br.brew_date < ?", (cutoff,))
+        conn.commit()
+    finally:
+        conn.close()
+    return moved
+
+def get_archive_summary():
+    """보관된 기록 수와 날짜 범위"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    summary = {'count': 0, 'first_date': None, 'last_date': None}
+    stats = read_archive_stats(cursor) if has_archive(cursor) else None
+    if stats:
+        summary.update({key: stats[key] for key in summary})
+    conn.close()
+    return summary
+
+# 외래 키 ON DELETE CASCADE 마이그레이션
+def _has_cascade_foreign_key(cursor, table):
+    cursor.execute(f"PRAGMA foreign_key_list({table})")
+    foreign_keys = cursor.fetchall()
+    return bool(foreign_keys) and all(fk[6] == 'CASCADE' for fk in foreign_keys)
+
+def _rebuild_table(cursor, table, foreign_key_sql, copy_where=''):
+    """컬럼은 그대로 두고 외래 키 정의만 바꿔 테이블을 다시 만듦 (인덱스 포함)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    table_info = cursor.fetchall()
+    columns = [row[1] for row in table_info]
+    primary_key = [row[1] for row in sorted(table_info, key=lambda row: row[5]) if row[5] > 0]
+    
+    column_defs = []
+    for _, name, col_type, not_null, default, pk in table_info:
+        if primary_key == ['id'] and name == 'id':
+            column_defs.append("id INTEGER PRIMARY KEY AUTOINCREMENT")
+            continue
+        column_def = f"{name} {col_type}".strip()
+        if not_null:
+            column_def += " NOT NULL"
+        if default is not None:
+            column_def += f" DEFAULT {default}"
+        column_defs.append(column_def)
+    if primary_key != ['id']:
+        column_defs.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+    column_defs.append(foreign_key_sql)
+    
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))
+    index_sqls = [row[0] for row in cursor.fetchall()]
+    
+    column_list = ', '.join(columns)
+    cursor.execute(f"CREATE TABLE {table}_new ({', '.join(column_defs)})")
+    cursor.execute(f"INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table} {copy_where}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for index_sql in index_sqls:
+        cursor.execute(index_sql)
+
+def rebuild_tables_with_cascade(cursor):
+    """brewing_records/pour_steps를 ON DELETE CASCADE 외래 키로 다시 만들고 고아 기록 정리"""
+    conn = cursor.connection
+    conn.commit()
+    cursor.execute("PRAGMA foreign_keys = OFF")  # 트랜잭션 밖에서만 적용됨
+    try:
+        # 테이블을 참조하는 뷰는 새로 만든 뒤 다시 생성
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'")
+        views = cursor.fetchall()
+        for name, _ in views:
+            cursor.execute(f"DROP VIEW {name}")
+        
+        _rebuild_table(cursor, 'brewing_records',
+                       "FOREIGN KEY (bean_id) REFERENCES beans (id) ON DELETE CASCADE",
+                       "WHERE bean_id IN (SELECT id FROM beans)")
+        _rebuild_table(cursor, 'pour_steps',
+                       "FOREIGN KEY (record_id) REFERENCES brewing_records (id) ON DELETE CASCADE",
+                       "WHERE record_id IN (SELECT id FROM brewing_records)")
+        for _, view_sql in views:
+            cursor.execute(view_sql)
+        
+        # 고아 기록이 빠졌을 수 있으므로 집계와 digest 재계산
+        rebuild_daily_rollups(cursor)
+        rebuild_content_digest(cursor)
+        
+        cursor.execute("PRAGMA foreign_key_check")
+        if cursor.fetchall():
+            raise sqlite3.IntegrityError("외래 키 마이그레이션 후에도 잘못된 참조가 남아 있습니다")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("PRAGMA foreign_keys = ON")
+
 # 데이터베이스 초기화 및 마이그레이션
 def init_database():
-    conn = sqlite3.connect('coffee_tracker.db')
+    conn = get_connection()
     cursor = conn.cursor()
+    migrate_database(cursor)
+    archive_max_age = get_archive_max_age(cursor)
+    conn.commit()
+    conn.close()
     
+    # 보관 기준을 설정했으면 시작할 때 오래된 기록을 보관 DB로 옮김
+    if archive_max_age:
+        archive_old_records(archive_max_age)
+    
+    # JSON 파일이 있으면 데이터 로드
+    if os.path.exists('data.json'):
+        # 현재 데이터베이스가 비어있는지 확인
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM beans")
+        bean_count = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM brewing_records")
+        record_count = cursor.fetchone()[0]
+        conn.close()
+        
+        # 데이터베이스가 비어있으면 JSON에서 로드
+        if bean_count == 0 and record_count == 0:
+            load_from_json()
+
+def migrate_database(cursor):
+    """테이블 생성 및 스키마 마이그레이션 (커밋은 호출하는 쪽에서)"""
     # 원두 테이블
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS beans (
@@ -126,7 +1240,7 @@ def init_database():
             overall_score INTEGER,
             tasting_notes TEXT,
             improvements TEXT,
-            FOREIGN KEY (bean_id) REFERENCES beans (id)
+            FOREIGN KEY (bean_id) REFERENCES beans (id) ON DELETE CASCADE
         )
     ''')
     
@@ -148,78 +1262,266 @@ def init_database():
         cursor.execute("ALTER TABLE brewing_records ADD COLUMN pour_schedule TEXT")
     except sqlite3.OperationalError:
         pass  # 이미 존재하면 무시
-    
-    conn.commit()
-    conn.close()
-    
-    # JSON 파일이 있으면 데이터 로드
-    if os.path.exists('data.json'):
-        # 현재 데이터베이스가 비어있는지 확인
-        conn = sqlite3.connect('coffee_tracker.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM beans")
-        bean_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM brewing_records")
-        record_count = cursor.fetchone()[0]
-        conn.close()
-        
-        # 데이터베이스가 비어있으면 JSON에서 로드
-        if bean_count == 0 and record_count == 0:
-            load_from_json()
+
+    # 파생 컬럼이 새로 추가되면 기존 기록 전체를 다시 계산
+    needs_backfill = False
+
+    try:
+        # days_off_roast 컬럼 추가 (로스팅 후 경과일, 삽입 시 계산)
+        cursor.execute("ALTER TABLE brewing_records ADD COLUMN days_off_roast INTEGER")
+        needs_backfill = True
+    except sqlite3.OperationalError:
+        pass  # 이미 존재하면 무시
+
+    try:
+        # brew_time_seconds 컬럼 추가 (추출 시간 문자열을 초 단위로 파싱)
+        cursor.execute("ALTER TABLE brewing_records ADD COLUMN brew_time_seconds INTEGER")
+        needs_backfill = True
+    except sqlite3.OperationalError:
+        pass  # 이미 존재하면 무시
+
+    # 푸어 단계 테이블 (pour_schedule JSON에서 파생)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pour_steps (
+            record_id INTEGER NOT NULL,
+            step INTEGER NOT NULL,
+            water_amount REAL,
+            offset_seconds INTEGER,
+            PRIMARY KEY (record_id, step),
+            FOREIGN KEY (record_id) REFERENCES brewing_records (id) ON DELETE CASCADE
+        )
+    ''')
+
+    if needs_backfill:
+        refresh_derived_fields(cursor, "1 = 1")
+
+    # 대량 가져오기 중복 검사 및 원두별 조회용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_brewing_records_bean_date ON brewing_records (bean_id, brew_date)")
+
+    # 추출 시간 범위 조회용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_brewing_records_brew_time ON brewing_records (brew_time_seconds, overall_score)")
+
+    # 목록 정렬(원두 등록일, 추출일)용 인덱스 (check_query_plans.py 참고)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_beans_created_date ON beans (created_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_brewing_records_brew_date ON brewing_records (brew_date)")
+    # 점수 분포는 score_rollups에서 읽으므로 점수 인덱스는 쓰기 비용만 늘림
+    cursor.execute("DROP INDEX IF EXISTS idx_brewing_records_overall_score")
+
+    # 원두별 로스팅 후 경과일 분석용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_brewing_records_freshness ON brewing_records (bean_id, days_off_roast, overall_score)")
+    # 경과일 구간 나누기는 get_freshness_scores에서 하므로 예전 구간별 점수 뷰는 삭제
+    cursor.execute("DROP VIEW IF EXISTS freshness_scores")
+
+    # 일별 집계 테이블 (날짜 x 원두 x 방법 x 도구), NULL은 ''로 저장
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            brew_date TEXT NOT NULL,
+            bean_id INTEGER NOT NULL,
+            method TEXT NOT NULL,
+            equipment TEXT NOT NULL,
+            brew_count INTEGER NOT NULL DEFAULT 0,
+            scored_count INTEGER NOT NULL DEFAULT 0,
+            taste_sum REAL NOT NULL DEFAULT 0,
+            aroma_sum REAL NOT NULL DEFAULT 0,
+            body_sum REAL NOT NULL DEFAULT 0,
+            acidity_sum REAL NOT NULL DEFAULT 0,
+            overall_sum REAL NOT NULL DEFAULT 0,
+            ratio_sum REAL NOT NULL DEFAULT 0,
+            ratio_count INTEGER NOT NULL DEFAULT 0,
+            taste_count INTEGER NOT NULL DEFAULT 0,
+            aroma_count INTEGER NOT NULL DEFAULT 0,
+            body_count INTEGER NOT NULL DEFAULT 0,
+            acidity_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (brew_date, bean_id, method, equipment)
+        )
+    ''')
+    # 세부 점수는 비어 있을 수 있어 점수마다 개수를 따로 둠 (이전 DB는 컬럼 추가 후 재계산)
+    needs_rollup_rebuild = False
+    rollup_columns = _table_columns(cursor, 'daily_rollups')
+    for col in ('taste_count', 'aroma_count', 'body_count', 'acidity_count'):
+        if col not in rollup_columns:
+            cursor.execute(f"ALTER TABLE daily_rollups ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+            needs_rollup_rebuild = True
+
+    # 만족도 값별 기록 수 (만족도 분포 차트용)
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'score_rollups'")
+    if cursor.fetchone()[0] == 0:
+        needs_rollup_rebuild = True
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS score_rollups (
+            overall_score INTEGER PRIMARY KEY,
+            brew_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # 원두/방법/도구별 점수 요약 그룹화용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollups_bean_method ON daily_rollups (bean_id, method)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollups_bean_equipment ON daily_rollups (bean_id, equipment)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollups_method ON daily_rollups (method)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollups_equipment ON daily_rollups (equipment)")
+
+    # 원두별 요약 테이블 (홈 화면 정렬/페이지용, 원두마다 한 행)
+    # 원두는 여러 곳(등록, 가져오기, 동기화, 복원)에서 추가/삭제되므로 행 추가/삭제는 트리거로 맞춤
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bean_rollups (
+            bean_id INTEGER PRIMARY KEY,
+            brew_count INTEGER NOT NULL DEFAULT 0,
+            scored_count INTEGER NOT NULL DEFAULT 0,
+            overall_sum REAL NOT NULL DEFAULT 0,
+            overall_score REAL,
+            last_brew_date TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bean_rollups_last_brew ON bean_rollups (last_brew_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bean_rollups_score ON bean_rollups (overall_score, brew_count)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_beans_roast_date ON beans (roast_date)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS beans_insert_rollup AFTER INSERT ON beans
+        BEGIN
+            INSERT OR IGNORE INTO bean_rollups (bean_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS beans_delete_rollup AFTER DELETE ON beans
+        BEGIN
+            DELETE FROM bean_rollups WHERE bean_id = OLD.id;
+        END
+    ''')
+
+    # 집계 테이블이 비어있는데 기록이 있으면 한 번에 재계산 (기존 DB 마이그레이션)
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM daily_rollups), EXISTS (SELECT 1 FROM brewing_records)")
+    has_rollups, has_records = cursor.fetchone()
+    if has_records and (needs_rollup_rebuild or not has_rollups):
+        rebuild_daily_rollups(cursor)
+    cursor.execute("SELECT (SELECT COUNT(*) FROM bean_rollups) != (SELECT COUNT(*) FROM beans)")
+    if cursor.fetchone()[0]:
+        cursor.execute("DELETE FROM bean_rollups WHERE bean_id NOT IN (SELECT id FROM beans)")
+        refresh_bean_rollups(cursor)
+
+    # 변경 추적 (기기 간 동기화)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('device_id', ?)", (uuid.uuid4().hex,))
+    cursor.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('row_version', '0')")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tombstones (
+            table_name TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            deleted_at TEXT NOT NULL,
+            row_version INTEGER NOT NULL,
+            PRIMARY KEY (table_name, uid)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            peer_device_id TEXT PRIMARY KEY,
+            last_version INTEGER NOT NULL,
+            synced_at TEXT
+        )
+    ''')
+
+    for table in ('beans', 'brewing_records'):
+        try:
+            # uid / updated_at / row_version 컬럼 추가 후 기존 행에 발급
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN uid TEXT")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TEXT")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER")
+            mark_changed(cursor, table, "1 = 1", content_uids=True)
+        except sqlite3.OperationalError:
+            pass  # 이미 존재하면 무시
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uid ON {table} (uid)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table} (row_version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tombstones_row_version ON tombstones (row_version)")
+
+    # 백업용 데이터 digest (처음 한 번 전체 계산)
+    if get_content_digest(cursor) is None:
+        rebuild_content_digest(cursor)
+
+    # 보관 DB가 붙어 있으면 컬럼 맞추기
+    if _archive_attached(cursor):
+        ensure_archive_schema(cursor)
+
+    # 외래 키에 ON DELETE CASCADE가 없는 이전 DB는 테이블을 다시 만듦
+    if not _has_cascade_foreign_key(cursor, 'brewing_records') or not _has_cascade_foreign_key(cursor, 'pour_steps'):
+        rebuild_tables_with_cascade(cursor)
 
 # 원두 저장 함수 (누락된 함수 추가)
 def save_bean(name, shop, variety, roast_date, notes):
-    conn = sqlite3.connect('coffee_tracker.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
         INSERT INTO beans (name, shop, variety, roast_date, notes, created_date)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (name, shop, variety, roast_date, notes, date.today()))
+    bean_id = cursor.lastrowid
+    mark_changed(cursor, 'beans', "b.id = ?", (bean_id,))
+    update_content_digest(cursor, 'beans', "b.id = ?", (bean_id,))
     
     conn.commit()
     conn.close()
     
-    # 자동 백업
+    # 자동 백업 및 세션 공유 캐시 갱신
     backup_to_json()
+    invalidate_shared_cache()
     st.success("원두가 등록되었습니다!")
 
 # 원두 삭제
 def delete_bean(bean_id):
-    conn = sqlite3.connect('coffee_tracker.db')
+    delete_beans([bean_id])
+
+# 여러 원두를 한 트랜잭션으로 삭제 (관련 추출 기록 포함, 백업은 한 번)
+def delete_beans(bean_ids):
+    bean_ids = [int(bean_id) for bean_id in bean_ids]
+    if not bean_ids:
+        return
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # 해당 원두의 추출 기록도 함께 삭제
-    cursor.execute("DELETE FROM brewing_records WHERE bean_id = ?", (bean_id,))
-    cursor.execute("DELETE FROM beans WHERE id = ?", (bean_id,))
+    placeholders = ', '.join(['?'] * len(bean_ids))
+    delete_beans_where(cursor, f"b.id IN ({placeholders})", bean_ids)
     
     conn.commit()
     conn.close()
     
-    # 자동 백업
+    # 자동 백업 및 세션 공유 캐시 갱신
     backup_to_json()
-    st.success("원두와 관련 추출 기록이 모두 삭제되었습니다!")
+    invalidate_shared_cache()
+    st.success(f"원두 {len(bean_ids)}개와 관련 추출 기록이 모두 삭제되었습니다!")
 
 # 추출 기록 삭제 (수정됨)
 def delete_brewing_record(record_id):
-    conn = sqlite3.connect('coffee_tracker.db')
+    delete_brewing_records([record_id])
+
+# 여러 추출 기록을 한 트랜잭션으로 삭제 (백업은 한 번)
+def delete_brewing_records(record_ids):
+    record_ids = [int(record_id) for record_id in record_ids]
+    if not record_ids:
+        return
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("DELETE FROM brewing_records WHERE id = ?", (record_id,))
+    placeholders = ', '.join(['?'] * len(record_ids))
+    delete_records_where(cursor, f"br.id IN ({placeholders})", record_ids)
     
     conn.commit()
     conn.close()
     
-    # 자동 백업
+    # 자동 백업 및 세션 공유 캐시 갱신
     backup_to_json()
-    st.success("추출 기록이 삭제되었습니다!")
+    invalidate_shared_cache()
+    st.success(f"추출 기록 {len(record_ids)}개가 삭제되었습니다!")
 
 # 추출 기록 저장
 def save_brewing_record(bean_id, brew_date, grind_size, coffee_amount, 
                        water_temp, brew_time, method, equipment, adding_water, pour_schedule,
                        taste_score, aroma_score, body_score, acidity_score, overall_score, 
                        tasting_notes, improvements):
-    conn = sqlite3.connect('coffee_tracker.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     # pour_schedule을 JSON 문자열로 변환
@@ -234,65 +1536,589 @@ def save_brewing_record(bean_id, brew_date, grind_size, coffee_amount,
     ''', (bean_id, brew_date, str(grind_size), coffee_amount, water_temp, 
           brew_time, method, equipment, adding_water, pour_schedule_json, taste_score, 
           aroma_score, body_score, acidity_score, overall_score, tasting_notes, improvements))
+    record_id = cursor.lastrowid
+    mark_changed(cursor, 'brewing_records', "br.id = ?", (record_id,))
+    update_content_digest(cursor, 'brewing_records', "br.id = ?", (record_id,))
+    refresh_derived_fields(cursor, "br.id = ?", (record_id,))
+    update_daily_rollups(cursor, "br.id = ?", (record_id,))
     
     conn.commit()
     conn.close()
     
-    # 자동 백업
+    # 자동 백업 및 세션 공유 캐시 갱신
     backup_to_json()
+    invalidate_shared_cache()
     st.success("추출 기록이 저장되었습니다!")
 
+# 추출 기록 DataFrame 구성 (메모리 절약)
+# 목록/필터에 쓰는 컬럼만 기본으로 읽고, 긴 텍스트는 화면에 보일 기록만 따로 읽음
+RECORD_LIST_COLUMNS = ['id', 'bean_id', 'brew_date', 'grind_size', 'coffee_amount', 'water_amount', 'water_temp',
+                       'brew_time', 'brew_time_seconds', 'days_off_roast', 'method', 'equipment', 'adding_water',
+                       'taste_score', 'aroma_score', 'body_score', 'acidity_score', 'overall_score']
+RECORD_TEXT_COLUMNS = ['pour_schedule', 'tasting_notes', 'improvements']
+RECORDS_PAGE_SIZE = 30
+RECORD_DTYPES = {
+    'id': 'int32', 'bean_id': 'int32',
+    # 값 종류가 적은 문자열은 category
+    'bean_name': 'category', 'brew_date': 'category', 'brew_time': 'category',
+    'method': 'category', 'equipment': 'category', 'grind_size': 'category',
+    'brew_time_seconds': 'Int32', 'days_off_roast': 'Int16',
+    'coffee_amount': 'float32', 'water_amount': 'float32', 'water_temp': 'float32',
+    'adding_water': 'float32', 'brewing_ratio': 'float32',
+    'taste_score': 'Int8', 'aroma_score': 'Int8', 'body_score': 'Int8',
+    'acidity_score': 'Int8', 'overall_score': 'Int8',
+}
+
+# 조회 쿼리 모음
+# 화면과 데이터 버전 계산에서 쓰는 조회 SQL은 모두 이름을 붙여 여기에 두고, check_query_plans.py가
+# EXPLAIN QUERY PLAN으로 큰 테이블 전체 스캔이나 임시 B-tree 정렬이 생기지 않았는지 확인함.
+# 쓰기/동기화/마이그레이션 안에서 한 행씩 확인하는 쿼리(sync_meta, tombstones 등)는 제외.
+# {records}는 추출 기록 테이블(보관 포함 시 UNION ALL), {columns}는 읽을 기록 컬럼 목록
+RECORDS_LIST_SQL = '''
+    SELECT {{columns}}, b.name AS bean_name, ''' + BREWING_RATIO_SQL + ''' AS brewing_ratio
+    FROM {{records}} br
+    JOIN beans b ON br.bean_id = b.id
+    {where}
+    ORDER BY br.brew_date DESC, br.id DESC
+'''
+BREW_PARAMETER_SQL = '''
+    SELECT br.grind_size, ''' + BREWING_RATIO_SQL + ''' AS brewing_ratio, br.water_temp, br.overall_score
+    FROM {{records}} br
+    WHERE br.overall_score IS NOT NULL AND br.water_temp IS NOT NULL {where}
+'''
+SCORE_SUMMARY_SQL = '''
+    SELECT {select}
+           SUM(r.brew_count) AS brew_count,
+           MAX(NULLIF(r.brew_date, '')) AS last_brew_date,
+           SUM(r.scored_count) AS scored_count,
+           SUM(r.overall_sum) AS overall_sum,
+           SUM(r.overall_sum) / NULLIF(SUM(r.scored_count), 0) AS overall_score,
+           SUM(r.taste_sum) / NULLIF(SUM(r.taste_count), 0) AS taste_score,
+           SUM(r.aroma_sum) / NULLIF(SUM(r.aroma_count), 0) AS aroma_score,
+           SUM(r.body_sum) / NULLIF(SUM(r.body_count), 0) AS body_score,
+           SUM(r.acidity_sum) / NULLIF(SUM(r.acidity_count), 0) AS acidity_score,
+           SUM(r.ratio_sum) / NULLIF(SUM(r.ratio_count), 0) AS brewing_ratio
+    FROM daily_rollups r
+    JOIN beans b ON r.bean_id = b.id
+    {where}
+    {group}
+'''
+# 집계 테이블 기반 점수 요약 그룹 (select 컬럼, group 컬럼)
+ROLLUP_GROUPS = {
+    'bean': (['r.bean_id', 'b.name AS bean_name'], ['r.bean_id']),
+    'method': (["NULLIF(r.method, '') AS method"], ['r.method']),
+    'equipment': (["NULLIF(r.equipment, '') AS equipment"], ['r.equipment']),
+    'date': (["NULLIF(r.brew_date, '') AS brew_date", 'r.bean_id', 'b.name AS bean_name'], ['r.brew_date', 'r.bean_id']),
+    'all': ([], []),
+}
+SCORE_INTERVAL_GROUPS = {'bean': 'bean_id', 'method': 'method', 'equipment': 'equipment'}
+
+# 홈 원두 카드 정렬 (이름, 기준 테이블과 정렬 컬럼) - 정렬 컬럼마다 인덱스가 있어 LIMIT만큼만 읽음
+HOME_BEAN_SORTS = {
+    'created': ('최근 등록순', "beans b JOIN bean_rollups s ON s.bean_id = b.id", "b.created_date DESC, b.id DESC"),
+    'recent': ('최근 추출순', "bean_rollups s JOIN beans b ON b.id = s.bean_id", "s.last_brew_date DESC, s.bean_id DESC"),
+    'score': ('평균 만족도순', "bean_rollups s JOIN beans b ON b.id = s.bean_id",
+              "s.overall_score DESC, s.brew_count DESC, s.bean_id DESC"),
+    'roast': ('로스팅 최신순', "beans b JOIN bean_rollups s ON s.bean_id = b.id", "b.roast_date DESC, b.id DESC"),
+}
+BEAN_SEARCH_SQL = "(b.name LIKE ? ESCAPE '\\' OR b.shop LIKE ? ESCAPE '\\' OR b.variety LIKE ? ESCAPE '\\')"
+BEAN_CARDS_SQL = '''
+    SELECT b.id, b.name, b.shop, b.variety, b.roast_date,
+           s.brew_count, s.overall_score, s.last_brew_date
+    FROM {source}
+    {where}
+    ORDER BY {order}
+    LIMIT ? OFFSET ?
+'''
+
+QUERIES = {
+    # NULL은 DESC 정렬에서 맨 뒤로 가므로 CASE 없이 인덱스 순서 그대로 읽음
+    'beans': "SELECT * FROM beans ORDER BY created_date DESC, id DESC",
+    'bean_info': "SELECT * FROM beans WHERE id = ?",
+    'bean_names': "SELECT id AS bean_id, name AS bean_name FROM beans",
+    'brewing_records': RECORDS_LIST_SQL.format(where=''),
+    'brewing_records_by_bean': RECORDS_LIST_SQL.format(where="WHERE br.bean_id = ?"),
+    'brewing_records_by_brew_time': RECORDS_LIST_SQL.format(where="WHERE br.brew_time_seconds BETWEEN ? AND ?"),
+    'brewing_records_by_bean_brew_time': RECORDS_LIST_SQL.format(
+        where="WHERE br.bean_id = ? AND br.brew_time_seconds BETWEEN ? AND ?"),
+    'record_texts': f'''
+        SELECT br.id, {', '.join(f'br.{col}' for col in RECORD_TEXT_COLUMNS)}
+        FROM {{records}} br
+        WHERE br.id IN (SELECT value FROM json_each(?))
+    ''',
+    # MIN과 MAX를 한 SELECT에 쓰면 인덱스 전체를 읽으므로 양 끝을 따로 읽음
+    'brew_time_bounds': '''
+        SELECT (SELECT MIN(br.brew_time_seconds) FROM {records} br),
+               (SELECT MAX(br.brew_time_seconds) FROM {records} br)
+    ''',
+    # 구간 나누기는 pandas에서 (초 단위로 묶으면 인덱스 순서 그대로 집계됨)
+    'brew_time_counts': '''
+        SELECT br.brew_time_seconds, COUNT(*) AS brew_count,
+               TOTAL(br.overall_score) AS overall_sum, COUNT(br.overall_score) AS scored_count
+        FROM {records} br
+        WHERE br.brew_time_seconds IS NOT NULL
+        GROUP BY br.brew_time_seconds
+        ORDER BY br.brew_time_seconds
+    ''',
+    'brew_time_counts_in_range': '''
+        SELECT br.brew_time_seconds, COUNT(*) AS brew_count,
+               TOTAL(br.overall_score) AS overall_sum, COUNT(br.overall_score) AS scored_count
+        FROM {records} br
+        WHERE br.brew_time_seconds BETWEEN ? AND ?
+        GROUP BY br.brew_time_seconds
+        ORDER BY br.brew_time_seconds
+    ''',
+    'score_distribution': "SELECT overall_score, brew_count AS count FROM score_rollups ORDER BY overall_score",
+    # 경과일 구간 나누기는 pandas에서 (get_freshness_scores)
+    'freshness_counts': '''
+        SELECT br.bean_id, br.days_off_roast, COUNT(*) AS brew_count,
+               TOTAL(br.overall_score) AS overall_sum, COUNT(br.overall_score) AS scored_count
+        FROM {records} br
+        WHERE br.days_off_roast >= 0
+        GROUP BY br.bean_id, br.days_off_roast
+        ORDER BY br.bean_id, br.days_off_roast
+    ''',
+    'brew_parameter_grid': BREW_PARAMETER_SQL.format(where=''),
+    'brew_parameter_grid_by_bean': BREW_PARAMETER_SQL.format(where="AND br.bean_id = ?"),
+    # 원두 페이지 변경 감지용 (export_snapshot.py, 기록 추가/삭제/수정 시 개수나 row_version이 바뀜)
+    'snapshot_bean_fingerprints': '''
+        SELECT b.id AS bean_id, b.row_version, b.updated_at,
+               COUNT(br.id) AS brew_count, MAX(br.row_version) AS records_version,
+               MAX(br.updated_at) AS records_updated_at
+        FROM beans b
+        LEFT JOIN {records} br ON br.bean_id = b.id
+        GROUP BY b.id
+    ''',
+    'backup_beans': "SELECT * FROM beans",
+    'backup_records': "SELECT * FROM {records} ORDER BY id",
+    # 보관 DB (archive 스키마가 붙어 있을 때만 실행)
+    'archive_tables': '''
+        SELECT COUNT(*) FROM archive.sqlite_master
+        WHERE type = 'table' AND name IN ('brewing_records', 'pour_steps')
+    ''',
+    # 보관 DB 요약을 처음 만들 때만 (이후로는 옮길 때마다 증감)
+    'archive_count': "SELECT COUNT(*) FROM archive.brewing_records",
+    # MIN과 MAX를 따로 읽어야 brew_date 인덱스의 양 끝만 봄
+    'archive_date_range': '''
+        SELECT (SELECT MIN(brew_date) FROM archive.brewing_records),
+               (SELECT MAX(brew_date) FROM archive.brewing_records)
+    ''',
+}
+for _group_by, (_select_cols, _group_cols) in ROLLUP_GROUPS.items():
+    _group_sql = f"GROUP BY {', '.join(_group_cols)} ORDER BY {', '.join(_group_cols)}" if _group_cols else ''
+    for _suffix, _where_sql in (('', ''), ('_by_bean', "WHERE r.bean_id = ?")):
+        QUERIES[f'score_summary_{_group_by}{_suffix}'] = SCORE_SUMMARY_SQL.format(
+            select=', '.join(_select_cols + ['']), where=_where_sql, group=_group_sql)
+for _sort, (_, _source_sql, _order_sql) in HOME_BEAN_SORTS.items():
+    QUERIES[f'bean_cards_{_sort}'] = BEAN_CARDS_SQL.format(source=_source_sql, where='', order=_order_sql)
+    QUERIES[f'bean_cards_{_sort}_search'] = BEAN_CARDS_SQL.format(
+        source=_source_sql, where=f"WHERE {BEAN_SEARCH_SQL}", order=_order_sql)
+QUERIES['bean_count'] = "SELECT COUNT(*) FROM beans"
+QUERIES['bean_count_search'] = f"SELECT COUNT(*) FROM beans b WHERE {BEAN_SEARCH_SQL}"
+for _group_by, _group_col in SCORE_INTERVAL_GROUPS.items():
+    QUERIES[f'score_intervals_{_group_by}'] = f'''
+        SELECT br.{_group_col}, br.overall_score
+        FROM {{records}} br
+        WHERE br.overall_score IS NOT NULL AND br.{_group_col} IS NOT NULL AND br.{_group_col} != ''
+    '''
+
+def query_sql(name, records='brewing_records', columns=None):
+    """이름으로 쿼리 SQL을 꺼냄 ({records}, {columns} 자리 채우기)"""
+    columns = columns or ', '.join(f'br.{col}' for col in RECORD_LIST_COLUMNS)
+    return QUERIES[name].format(records=records, columns=columns)
+
 # 원두 목록 가져오기 (최신순 정렬 강화)
 def get_beans():
-    conn = sqlite3.connect('coffee_tracker.db')
-    # created_date가 NULL인 경우를 대비해 id로도 정렬
-    df = pd.read_sql_query("""
-        SELECT * FROM beans 
-        ORDER BY 
-            CASE WHEN created_date IS NULL THEN 1 ELSE 0 END,
-            created_date DESC, 
-            id DESC
-    """, conn)
+    conn = get_connection()
+    df = pd.read_sql_query(query_sql('beans'), conn)
     conn.close()
     return df
 
+# 홈 원두 카드 (검색/정렬/페이지 나누기는 SQL에서, 보이는 카드만 읽음)
+HOME_BEANS_PER_PAGE = 10
+
+def _bean_search_params(search):
+    """이름/구매처/품종 부분 일치 검색어 (LIKE의 %, _는 글자 그대로 검색)"""
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', search.strip()) + '%'
+    return (pattern,) * 3
+
+def get_bean_cards(sort='created', search='', offset=0, limit=HOME_BEANS_PER_PAGE):
+    query_name, params = f'bean_cards_{sort}', ()
+    if search.strip():
+        query_name, params = f'bean_cards_{sort}_search', _bean_search_params(search)
+    conn = get_connection()
+    df = pd.read_sql_query(query_sql(query_name), conn, params=params + (int(limit), int(offset)))
+    conn.close()
+    return df
+
+def count_beans(search=''):
+    query_name, params = 'bean_count', ()
+    if search.strip():
+        query_name, params = 'bean_count_search', _bean_search_params(search)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query_sql(query_name), params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def compact_records_frame(df):
+    """추출 기록 DataFrame을 작은 dtype으로 변환 (분쇄도는 가져온 글자 값을 살려 category로)"""
+    if 'grind_size' in df:
+        df['grind_size'] = normalize_grind_size(df['grind_size'])
+    for col, dtype in RECORD_DTYPES.items():
+        if col in df:
+            df[col] = df[col].astype(dtype)
+    return df
+
 # 특정 원두의 추출 기록 가져오기 (최신순 정렬 강화)
-def get_brewing_records(bean_id=None):
-    conn = sqlite3.connect('coffee_tracker.db')
+def get_brewing_records(bean_id=None, brew_time_range=None, include_archive=False, include_text=False):
+    """추출 기록 조회 (brew_time_range=(최소초, 최대초)이면 추출 시간 인덱스로 범위 조회)
+
+    기본은 최근 기록만 조회하고, include_archive=True이면 보관된 기록까지 포함.
+    긴 텍스트 컬럼(푸어 스케줄, 노트)은 include_text=True일 때만 읽음.
+    """
+    query_name = 'brewing_records'
+    params = []
     if bean_id:
-        query = '''
-            SELECT br.*, b.name as bean_name 
-            FROM brewing_records br 
-            JOIN beans b ON br.bean_id = b.id 
-            WHERE br.bean_id = ?
-            ORDER BY 
-                CASE WHEN br.brew_date IS NULL THEN 1 ELSE 0 END,
-                br.brew_date DESC, 
-                br.id DESC
-        '''
-        df = pd.read_sql_query(query, conn, params=(bean_id,))
-    else:
-        query = '''
-            SELECT br.*, b.name as bean_name 
-            FROM brewing_records br 
-            JOIN beans b ON br.bean_id = b.id 
-            ORDER BY 
-                CASE WHEN br.brew_date IS NULL THEN 1 ELSE 0 END,
-                br.brew_date DESC, 
-                br.id DESC
-        '''
-        df = pd.read_sql_query(query, conn)
+        query_name = 'brewing_records_by_bean'
+        params.append(int(bean_id))
+    if brew_time_range:
+        query_name = 'brewing_records_by_bean_brew_time' if bean_id else 'brewing_records_by_brew_time'
+        params.extend(int(value) for value in brew_time_range)
+    columns = RECORD_LIST_COLUMNS + (RECORD_TEXT_COLUMNS if include_text else [])
+
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive)
+    query = query_sql(query_name, source, ', '.join(f'br.{col}' for col in columns))
+    df = pd.read_sql_query(query, conn, params=params)
     conn.close()
-    return df
+    return compact_records_frame(df)
+
+# 화면에 표시할 기록의 긴 텍스트 컬럼만 가져오기 (id 인덱스)
+def get_record_texts(record_ids, include_archive=False):
+    record_ids = [int(record_id) for record_id in record_ids]
+    if not record_ids:
+        return pd.DataFrame(columns=RECORD_TEXT_COLUMNS)
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive)
+    df = pd.read_sql_query(query_sql('record_texts', source), conn, params=(json.dumps(record_ids),))
+    conn.close()
+    return df.set_index('id')
+
+# 추출 시간(초)의 최소/최대값
+def get_brew_time_bounds(include_archive=False):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query_sql('brew_time_bounds', records_source(cursor, include_archive)))
+    bounds = cursor.fetchone()
+    conn.close()
+    return bounds
+
+# 추출 시간 구간별 추출 횟수와 평균 만족도 (보관된 기록 포함)
+def get_brew_time_scores(bucket_seconds=30, brew_time_range=None):
+    query_name, params = 'brew_time_counts', ()
+    if brew_time_range:
+        query_name, params = 'brew_time_counts_in_range', tuple(int(value) for value in brew_time_range)
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive=True)
+    counts = pd.read_sql_query(query_sql(query_name, source), conn, params=params)
+    conn.close()
+    counts['bucket_seconds'] = counts['brew_time_seconds'] // bucket_seconds * bucket_seconds
+    df = counts.groupby('bucket_seconds', as_index=False)[['brew_count', 'overall_sum', 'scored_count']].sum()
+    df['overall_score'] = df['overall_sum'] / df['scored_count'].where(df['scored_count'] > 0)
+    df['brew_time'] = df['bucket_seconds'].map(format_duration)
+    return df[['bucket_seconds', 'brew_count', 'overall_score', 'brew_time']]
 
 # 특정 원두 정보 가져오기
 def get_bean_info(bean_id):
-    conn = sqlite3.connect('coffee_tracker.db')
-    query = "SELECT * FROM beans WHERE id = ?"
-    df = pd.read_sql_query(query, conn, params=(bean_id,))
+    conn = get_connection()
+    df = pd.read_sql_query(query_sql('bean_info'), conn, params=(int(bean_id),))
     conn.close()
     return df.iloc[0] if not df.empty else None
 
+# 집계 테이블 기반 점수 요약 (원두/방법/도구/날짜별)
+def get_score_summary(group_by='bean', bean_id=None):
+    """daily_rollups에서 그룹별 추출 횟수와 평균 점수를 계산 (비용은 기록 수가 아닌 일 수에 비례)"""
+    query_name, params = f'score_summary_{group_by}', ()
+    if bean_id:
+        query_name, params = f'score_summary_{group_by}_by_bean', (int(bean_id),)
+
+    conn = get_connection()
+    df = pd.read_sql_query(query_sql(query_name), conn, params=params)
+    conn.close()
+    if group_by == 'all' and df['brew_count'].isna().all():
+        return df.iloc[0:0]
+    return df
+
+# 전체 만족도 분포 (점수별 추출 횟수)
+def get_score_distribution():
+    conn = get_connection()
+    df = pd.read_sql_query(query_sql('score_distribution'), conn)
+    conn.close()
+    return df
+
+# 원두별 로스팅 후 경과일 구간의 평균 만족도 (보관된 기록 포함)
+def get_freshness_scores():
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive=True)
+    counts = pd.read_sql_query(query_sql('freshness_counts', source), conn)
+    bean_names = pd.read_sql_query(query_sql('bean_names'), conn)
+    conn.close()
+    bucket_starts = [start for start, _ in FRESHNESS_BUCKETS]
+    counts['bucket_start'] = [bucket_starts[i] for i in
+                              np.searchsorted(bucket_starts, counts['days_off_roast'], side='right') - 1]
+    df = counts.groupby(['bean_id', 'bucket_start'], as_index=False)[['brew_count', 'overall_sum', 'scored_count']].sum()
+    df['overall_score'] = df['overall_sum'] / df['scored_count'].where(df['scored_count'] > 0)
+    df = df.merge(bean_names, on='bean_id')
+    df['rest_days'] = df['bucket_start'].map(dict(FRESHNESS_BUCKETS))
+    return df[['bean_id', 'bean_name', 'bucket_start', 'brew_count', 'overall_score', 'rest_days']]
+
+# 데이터 버전 (내용 digest + 보관 세대 번호, 보관만 해도 최근 기록 기반 차트는 바뀌므로)
+def get_data_version():
+    conn = get_connection()
+    cursor = conn.cursor()
+    version = get_content_digest(cursor) or ''
+    if has_archive(cursor):
+        stats = read_archive_stats(cursor)
+        version += f":{stats['generation'] if stats else 0}"
+    conn.close()
+    return version
+
+# 원두/방법/도구별 점수 신뢰구간 (보관된 기록 포함 전체 기록으로 계산)
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_score_intervals(group_by, data_version):
+    """그룹별 평균, 축소 평균, bootstrap 신뢰구간 (data_version이 같으면 캐시 재사용)"""
+    group_col = SCORE_INTERVAL_GROUPS[group_by]
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive=True)
+    df = pd.read_sql_query(query_sql(f'score_intervals_{group_by}', source), conn)
+    beans_df = pd.read_sql_query(query_sql('bean_names'), conn)
+    conn.close()
+    intervals = analytics.score_intervals(df, group_col)
+    if group_by == 'bean':
+        intervals = intervals.merge(beans_df, on='bean_id', how='left')
+    return intervals
+
+# 통계 차트 (패널을 열 때만 만들고, 데이터 버전별로 직렬화된 spec을 캐시)
+def _score_distribution_chart():
+    score_distribution = get_score_distribution()
+    if score_distribution.empty:
+        return None
+    return px.bar(score_distribution, x='overall_score', y='count',
+                  title='📊 전체 만족도 분포', range_x=[0.5, 5.5])
+
+def _bean_scores_chart():
+    bean_scores = get_score_summary('bean')
+    fig = px.bar(bean_scores, x='bean_name', y='overall_score',
+                 title='• 원두별 평균 만족도')
+    fig.update_xaxes(tickangle=45)
+    return fig
+
+def _method_scores_chart():
+    method_scores = get_score_summary('method').dropna(subset=['method'])
+    if method_scores.empty:
+        return None
+    return px.bar(method_scores, x='method', y='overall_score',
+                  title='🎯 추출 방법별 평균 만족도')
+
+def _equipment_scores_chart():
+    equipment_scores = get_score_summary('equipment').dropna(subset=['equipment'])
+    if equipment_scores.empty:
+        return None
+    return px.bar(equipment_scores, x='equipment', y='overall_score',
+                  title='🛠️ 추출 도구별 평균 만족도')
+
+def _bean_counts_chart():
+    return px.pie(get_score_summary('bean'), values='brew_count', names='bean_name',
+                  title='• 원두별 추출 횟수')
+
+def _freshness_chart():
+    freshness_scores = get_freshness_scores()
+    if freshness_scores.empty:
+        return None
+    return px.bar(freshness_scores, x='rest_days', y='overall_score', color='bean_name',
+                  barmode='group', hover_data=['brew_count'],
+                  category_orders={'rest_days': [label for _, label in FRESHNESS_BUCKETS]},
+                  title='🌱 로스팅 후 경과일별 평균 만족도')
+
+def _brew_time_chart():
+    brew_time_scores = get_brew_time_scores()
+    if brew_time_scores.empty:
+        return None
+    return px.bar(brew_time_scores, x='brew_time', y='overall_score', hover_data=['brew_count'],
+                  title='⏱️ 추출 시간별 평균 만족도')
+
+def _daily_trend_chart():
+    daily_scores = get_score_summary('date').dropna(subset=['brew_date'])
+    if len(daily_scores) < 2:
+        return None
+    daily_scores['brew_date'] = pd.to_datetime(daily_scores['brew_date'])
+    return px.line(daily_scores, x='brew_date', y='overall_score',
+                   color='bean_name', title='📈 시간별 만족도 추이', markers=True)
+
+def _score_intervals_chart(group_by, title):
+    intervals = get_score_intervals(group_by, get_data_version())
+    if intervals.empty:
+        return None
+    label_col = 'bean_name' if group_by == 'bean' else SCORE_INTERVAL_GROUPS[group_by]
+    intervals = intervals.assign(error_plus=intervals['ci_high'] - intervals['mean'],
+                                 error_minus=intervals['mean'] - intervals['ci_low'])
+    fig = px.scatter(intervals, x=label_col, y='mean', error_y='error_plus', error_y_minus='error_minus',
+                     hover_data=['brew_count', 'ci_low', 'ci_high'], title=title)
+    fig.data[0].name = f"평균 ({analytics.CONFIDENCE:.0%} 신뢰구간)"
+    fig.data[0].showlegend = True
+    fig.add_scatter(x=intervals[label_col], y=intervals['shrunk_mean'], mode='markers',
+                    marker_symbol='diamond', marker_size=10, name='축소 평균 (순위 기준)')
+    fig.update_yaxes(range=[0.5, 5.5])
+    return fig
+
+# 분쇄도 × 비율 × 물 온도 격자의 평균 만족도 (원두별, 데이터 버전별 캐시)
+BREW_PARAMETER_BINS = {
+    'grind_size': ('분쇄도 (클릭)', 2),
+    'brewing_ratio': ('비율 (1:x)', 1.0),
+    'water_temp': ('물 온도 (°C)', 2),
+}
+HEATMAP_PAIRS = [('grind_size', 'brewing_ratio'), ('grind_size', 'water_temp'), ('brewing_ratio', 'water_temp')]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_brew_parameter_heatmaps(bean_id, data_version):
+    """원두(None이면 전체)의 추출 변수 조합별 히트맵 spec 목록 (기록이 부족하면 빈 목록)"""
+    query_name, params = 'brew_parameter_grid', ()
+    if bean_id:
+        query_name, params = 'brew_parameter_grid_by_bean', (int(bean_id),)
+    conn = get_connection()
+    source = records_source(conn.cursor(), include_archive=True)
+    df = pd.read_sql_query(query_sql(query_name, source), conn, params=params)
+    conn.close()
+    df['grind_size'] = pd.to_numeric(df['grind_size'], errors='coerce')
+    df = df.dropna()
+    if len(df) < 2:
+        return []
+
+    columns = list(BREW_PARAMETER_BINS)
+    grid = analytics.binned_scores(df[columns].to_numpy(), df['overall_score'].to_numpy(),
+                                   [width for _, width in BREW_PARAMETER_BINS.values()])
+    # 분위수 범위 밖 값이 있는 기록은 격자에서 빠지므로 제목에 개수를 표시
+    outlier_note = f" (범위 밖 {grid['outliers']}회 제외)" if grid['outliers'] else ''
+    specs = []
+    for x_col, y_col in HEATMAP_PAIRS:
+        x_axis, y_axis = columns.index(x_col), columns.index(y_col)
+        counts, means = analytics.marginal_scores(grid, (y_axis, x_axis))
+        x_label, y_label = BREW_PARAMETER_BINS[x_col][0], BREW_PARAMETER_BINS[y_col][0]
+        fig = px.imshow(means, x=analytics.bin_centers(grid['edges'][x_axis]),
+                        y=analytics.bin_centers(grid['edges'][y_axis]),
+                        origin='lower', aspect='auto', zmin=1, zmax=5, color_continuous_scale='YlOrBr',
+                        labels={'x': x_label, 'y': y_label, 'color': '평균 만족도'},
+                        title=f"{x_label} × {y_label}{outlier_note}")
+        fig.update_traces(customdata=counts.astype(int),
+                          hovertemplate=f"{x_label}: %{{x}}<br>{y_label}: %{{y}}<br>"
+                                        "평균 만족도: %{z:.2f}<br>추출 %{customdata}회<extra></extra>")
+        fig.update_layout(height=400)
+        specs.append(fig.to_plotly_json())
+    return specs
+
+STATS_CHARTS = {
+    'score_distribution': ('📊 만족도 분포', _score_distribution_chart),
+    'bean_scores': ('• 원두별 평균 만족도', _bean_scores_chart),
+    'method_scores': ('🎯 추출 방법별 만족도', _method_scores_chart),
+    'equipment_scores': ('🛠️ 추출 도구별 만족도', _equipment_scores_chart),
+    'bean_counts': ('• 원두별 추출 횟수', _bean_counts_chart),
+    'freshness': ('🌱 로스팅 후 경과일별 만족도', _freshness_chart),
+    'brew_time': ('⏱️ 추출 시간별 만족도', _brew_time_chart),
+    'daily_trend': ('📈 시간별 만족도 추이', _daily_trend_chart),
+    'bean_intervals': ('🏅 원두별 점수 신뢰구간',
+                       lambda: _score_intervals_chart('bean', '🏅 원두별 평균 만족도와 신뢰구간')),
+    'method_intervals': ('🎯 추출 방법별 점수 신뢰구간',
+                         lambda: _score_intervals_chart('method', '🎯 추출 방법별 평균 만족도와 신뢰구간')),
+    'equipment_intervals': ('🛠️ 추출 도구별 점수 신뢰구간',
+                            lambda: _score_intervals_chart('equipment', '🛠️ 추출 도구별 평균 만족도와 신뢰구간')),
+}
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_stats_chart_spec(chart_name, data_version):
+    """차트 spec(dict)을 만들어 반환 (data_version이 같으면 캐시된 spec 재사용, 데이터가 없으면 None)"""
+    fig = STATS_CHARTS[chart_name][1]()
+    if fig is None:
+        return None
+    fig.update_layout(height=400)
+    return fig.to_plotly_json()
+
+# 세션 공유 조회 캐시
+# Streamlit 세션끼리는 아무것도 공유하지 않아 새 방문자마다 DB 초기화와 첫 조회를 다시 했음.
+# 홈/기록/통계에서 매번 읽는 결과를 프로세스에 하나뿐인 캐시(st.cache_resource)에 두고,
+# 데이터 버전이 바뀌면 버리고 다시 읽음 (다른 프로세스나 sync_db.py가 DB를 바꿔도 안전).
+# 앱의 쓰기 함수는 커밋 직후 invalidate_shared_cache()로 비우기만 하고, 다시 읽는 건 다음 조회 때 필요한 항목만
+# (저장할 때마다 전체 기록/신뢰구간/차트를 다시 계산하면 쓰기 비용이 기록 수에 비례하게 됨)
+SHARED_CACHE_MAX_ENTRIES = 64
+SHARED_READS = {
+    'beans': lambda: get_beans(),
+    'bean_cards': lambda *args: get_bean_cards(*args),
+    'bean_count': lambda *args: count_beans(*args),
+    'score_summary': lambda group_by='bean', bean_id=None: get_score_summary(group_by, bean_id),
+    'brewing_records': lambda *args: get_brewing_records(*args),
+}
+# 서버 시작 시 미리 채울 조회 (이름, 화면에서 shared_read에 넘기는 인자 그대로)
+# 기록 페이지 기본값: 원두 전체, 추출 시간 범위 없음, 보관된 기록 제외
+WARM_READS = [('bean_cards', ('created', '', 0)), ('bean_count', ('',)), ('score_summary', ('all',)),
+              ('beans', ()), ('score_summary', ('bean',)), ('brewing_records', (None, None, False))]
+WARM_STATS_CHARTS = ['score_distribution']
+
+class SharedReadCache:
+    """세션끼리 공유하는 조회 결과 (데이터 버전이 바뀌면 비움, 오래 안 쓴 항목부터 버림)"""
+
+    def __init__(self, max_entries=SHARED_CACHE_MAX_ENTRIES):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.version = None
+        self.entries = OrderedDict()
+
+    def get(self, key, loader, version):
+        with self.lock:
+            if version != self.version:
+                self.version, self.entries = version, OrderedDict()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        # 읽는 동안에는 잠그지 않음 (같은 항목을 두 세션이 동시에 읽어도 결과는 같음)
+        value = loader()
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = value
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.version, self.entries = None, OrderedDict()
+
+def warm_shared_cache(cache):
+    """자주 읽는 조회와 통계 집계를 미리 계산해 둠"""
+    data_version = get_data_version()
+    for name, args in WARM_READS:
+        cache.get((name, args), lambda: SHARED_READS[name](*args), data_version)
+    get_score_intervals('bean', data_version)
+    for chart_name in WARM_STATS_CHARTS:
+        get_stats_chart_spec(chart_name, data_version)
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    """프로세스에 하나뿐인 공유 캐시 (처음 만들 때 DB 초기화와 warm-up을 한 번만 실행)"""
+    init_database()
+    cache = SharedReadCache()
+    warm_shared_cache(cache)
+    return cache
+
+def shared_read(name, *args):
+    """SHARED_READS[name](*args) 결과를 공유 캐시에서 꺼냄 (세션이 고쳐도 다른 세션에 영향 없도록 얕은 복사)"""
+    value = get_shared_cache().get((name, args), lambda: SHARED_READS[name](*args), get_data_version())
+    return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+def invalidate_shared_cache():
+    """쓰기 직후 공유 캐시를 비움 (각 항목은 다음에 읽을 때 새 데이터로 다시 계산)"""
+    get_shared_cache().clear()
+
 # 커핑 노트 템플릿 데이터
 def get_cupping_notes_template():
     return {
@@ -435,8 +2261,10 @@ def main():
     </style>
     """, unsafe_allow_html=True)
     
-    # 데이터베이스 초기화
-    init_database()
+    # 데이터베이스 초기화와 공유 캐시 warm-up은 프로세스당 한 번 (DB 파일이 없어졌으면 다시)
+    if not os.path.exists('coffee_tracker.db'):
+        get_shared_cache.clear()
+    get_shared_cache()
     
     # 세션 상태 초기화
     if 'selected_bean_id' not in st.session_state:
@@ -506,33 +2334,57 @@ def main():
     if menu == "🏠 홈":
         st.header("등록된 원두 목록")
         
-        beans_df = get_beans()
-        brewing_records_df = get_brewing_records()
+        # 원두 수와 추출 횟수/평균은 집계 테이블에서 (보관된 기록 포함)
+        total_beans = shared_read('bean_count', '')
+        overall_summary = shared_read('score_summary', 'all')
         
         # 요약 정보
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("등록된 원두", len(beans_df))
+            st.metric("등록된 원두", total_beans)
         with col2:
-            st.metric("총 추출 횟수", len(brewing_records_df))
+            st.metric("총 추출 횟수", int(overall_summary['brew_count'].iloc[0]) if not overall_summary.empty else 0)
         with col3:
-            if not brewing_records_df.empty:
-                avg_score = brewing_records_df['overall_score'].mean()
+            if not overall_summary.empty and pd.notna(overall_summary['overall_score'].iloc[0]):
+                avg_score = overall_summary['overall_score'].iloc[0]
                 st.metric("평균 만족도", f"{avg_score:.1f}/5")
             else:
                 st.metric("평균 만족도", "0/5")
         
         st.markdown("---")
         
-        if not beans_df.empty:
+        if total_beans:
             st.subheader("☕ 원두를 터치해서 추출을 시작하세요!")
             
-            # 모바일 최적화: 1열 또는 2열로 배치
-            for idx, (_, bean) in enumerate(beans_df.iterrows()):
-                # 해당 원두의 추출 횟수 계산
-                bean_records = brewing_records_df[brewing_records_df['bean_id'] == bean['id']]
-                brew_count = len(bean_records)
-                last_brew = bean_records['brew_date'].max() if not bean_records.empty else "없음"
+            # 검색/정렬은 SQL로 하고 현재 페이지의 카드만 그림 (원두가 많아도 화면 비용은 같음)
+            def set_bean_page(page):
+                # 여러 개 삭제 선택은 현재 페이지의 원두 목록 기준이므로 페이지/검색/정렬이 바뀌면 비움
+                st.session_state.home_bean_page = page
+                st.session_state.pop("bulk_delete_beans", None)
+                st.session_state.pop("confirm_bulk_delete_beans", None)
+            
+            def reset_bean_page():
+                set_bean_page(0)
+            
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                bean_search = st.text_input("🔍 원두 검색", placeholder="이름, 구매처, 품종",
+                                            key="home_bean_search", on_change=reset_bean_page)
+            with col2:
+                bean_sort = st.selectbox("정렬", list(HOME_BEAN_SORTS), format_func=lambda sort: HOME_BEAN_SORTS[sort][0],
+                                         key="home_bean_sort", on_change=reset_bean_page)
+            
+            matched_beans = shared_read('bean_count', bean_search) if bean_search.strip() else total_beans
+            page_count = max((matched_beans - 1) // HOME_BEANS_PER_PAGE + 1, 1)
+            bean_page = min(st.session_state.get('home_bean_page', 0), page_count - 1)
+            bean_cards = shared_read('bean_cards', bean_sort, bean_search, bean_page * HOME_BEANS_PER_PAGE)
+            
+            if bean_cards.empty:
+                st.info("🔍 검색 결과가 없습니다.")
+            
+            for _, bean in bean_cards.iterrows():
+                brew_count = int(bean['brew_count'])
+                last_brew = bean['last_brew_date'] or "없음"
                 
                 # 모바일 친화적 카드 디자인
                 st.markdown(f"""
@@ -578,6 +2430,39 @@ def main():
                         st.rerun()
                 
                 st.markdown("<br>", unsafe_allow_html=True)  # 카드 간 간격
+            
+            # 페이지 이동
+            if page_count > 1:
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    if st.button("◀ 이전", key="home_bean_prev", disabled=bean_page == 0, use_container_width=True):
+                        set_bean_page(bean_page - 1)
+                        st.rerun()
+                with col2:
+                    first = bean_page * HOME_BEANS_PER_PAGE + 1
+                    st.caption(f"{first}-{first + len(bean_cards) - 1} / {matched_beans}개 ({bean_page + 1}/{page_count} 페이지)")
+                with col3:
+                    if st.button("다음 ▶", key="home_bean_next", disabled=bean_page >= page_count - 1, use_container_width=True):
+                        set_bean_page(bean_page + 1)
+                        st.rerun()
+            
+            # 여러 원두 한 번에 삭제 (한 트랜잭션, 백업 한 번) - 현재 페이지의 원두 중에서 선택
+            with st.expander("🗑️ 원두 여러 개 삭제"):
+                bean_names = dict(zip(bean_cards['id'].astype(int), bean_cards['name']))
+                bean_brew_counts = dict(zip(bean_cards['id'].astype(int), bean_cards['brew_count'].astype(int)))
+                selected_bean_ids = st.multiselect(
+                    "삭제할 원두 (현재 페이지)", list(bean_names.keys()), format_func=lambda bean_id: bean_names[bean_id],
+                    key="bulk_delete_beans"
+                )
+                if selected_bean_ids:
+                    selected_records = sum(bean_brew_counts[bean_id] for bean_id in selected_bean_ids)
+                    st.warning(f"⚠️ 원두 {len(selected_bean_ids)}개와 관련 추출 기록 {selected_records}개가 모두 삭제됩니다!")
+                    confirm_bulk = st.checkbox("삭제를 확인합니다", key="confirm_bulk_delete_beans")
+                    if st.button(f"🗑️ 선택한 원두 {len(selected_bean_ids)}개 삭제", disabled=not confirm_bulk, use_container_width=True):
+                        delete_beans(selected_bean_ids)
+                        del st.session_state["bulk_delete_beans"]
+                        del st.session_state["confirm_bulk_delete_beans"]
+                        st.rerun()
         else:
             st.info("아직 등록된 원두가 없습니다. 먼저 원두를 등록해주세요!")
             if st.button("➕ 원두 등록하러 가기", use_container_width=True):
@@ -607,45 +2492,15 @@ def main():
                         json.dump(backup_data, f, ensure_ascii=False, indent=2)
                     
                     # 복원 실행
-                    conn = sqlite3.connect('coffee_tracker.db')
+                    conn = get_connection()
                     cursor = conn.cursor()
-                    
-                    # 기존 데이터 삭제
-                    cursor.execute("DELETE FROM brewing_records")
-                    cursor.execute("DELETE FROM beans")
-                    
-                    # 원두 데이터 복원
-                    if backup_data.get("beans"):
-                        for bean in backup_data["beans"]:
-                            cursor.execute('''
-                                INSERT INTO beans (id, name, shop, variety, roast_date, notes, created_date)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (bean.get('id'), bean.get('name'), bean.get('shop'), 
-                                 bean.get('variety'), bean.get('roast_date'), 
-                                 bean.get('notes'), bean.get('created_date')))
-                    
-                    # 추출 기록 데이터 복원
-                    if backup_data.get("brewing_records"):
-                        for record in backup_data["brewing_records"]:
-                            cursor.execute('''
-                                INSERT INTO brewing_records (id, bean_id, brew_date, grind_size, coffee_amount,
-                                                           water_amount, water_temp, brew_time, method, equipment,
-                                                           adding_water, pour_schedule, taste_score, aroma_score,
-                                                           body_score, acidity_score, overall_score, tasting_notes, improvements)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (record.get('id'), record.get('bean_id'), record.get('brew_date'),
-                                 record.get('grind_size'), record.get('coffee_amount'), record.get('water_amount'),
-                                 record.get('water_temp'), record.get('brew_time'), record.get('method'),
-                                 record.get('equipment'), record.get('adding_water'), record.get('pour_schedule'),
-                                 record.get('taste_score'), record.get('aroma_score'), record.get('body_score'),
-                                 record.get('acidity_score'), record.get('overall_score'), 
-                                 record.get('tasting_notes'), record.get('improvements')))
-                    
+                    restore_backup_data(cursor, backup_data)
                     conn.commit()
                     conn.close()
                     
                     # 복원 후 즉시 백업하여 data.json 업데이트
                     backup_to_json()
+                    invalidate_shared_cache()
                     
                     # 임시 파일 삭제
                     if os.path.exists('temp_restore.json'):
@@ -658,36 +2513,104 @@ def main():
                     st.error(f"❌ 복원 중 오류가 발생했습니다: {str(e)}")
         
         with col3:
-            # 다운로드 버튼
+            # 다운로드 버튼 (백업 파일은 다운로드를 요청할 때만 읽음)
             if os.path.exists('data.json'):
-                with open('data.json', 'r', encoding='utf-8') as f:
-                    json_data = f.read()
-                
-                st.download_button(
-                    label="📥 백업 다운로드",
-                    data=json_data,
-                    file_name=f"coffee_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True,
-                    help="현재 데이터를 JSON 파일로 다운로드"
-                )
+                if not st.session_state.get('backup_download_requested', False):
+                    if st.button("📥 백업 다운로드", use_container_width=True, help="현재 데이터를 JSON 파일로 다운로드"):
+                        st.session_state.backup_download_requested = True
+                        st.rerun()
+                else:
+                    def finish_backup_download():
+                        st.session_state.backup_download_requested = False
+                    
+                    st.download_button(
+                        label="💾 JSON 파일 저장",
+                        data=read_backup_bytes(),
+                        file_name=f"coffee_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                        mime="application/json",
+                        use_container_width=True,
+                        on_click=finish_backup_download,
+                        help="현재 데이터를 JSON 파일로 다운로드"
+                    )
             else:
                 st.info("아직 백업 파일이 없습니다")
         
-        # 백업 파일 정보 표시
-        if os.path.exists('data.json'):
-            try:
-                with open('data.json', 'r', encoding='utf-8') as f:
-                    backup_data = json.load(f)
-                
-                backup_date = backup_data.get('backup_date', '알 수 없음')
-                beans_count = len(backup_data.get('beans', []))
-                records_count = len(backup_data.get('brewing_records', []))
-                
-                st.caption(f"📁 백업 파일 정보: {backup_date} | 원두 {beans_count}개 | 기록 {records_count}개")
-            except:
-                pass
-    
+        # 백업 파일 정보 표시 (data.json 대신 manifest만 읽음)
+        try:
+            manifest = get_backup_manifest()
+            if manifest:
+                st.caption(f"📁 백업 파일 정보: {manifest['backup_date']} | 원두 {manifest['beans']}개 | "
+                           f"기록 {manifest['brewing_records']}개 | {manifest['size'] / 1024:.1f}KB")
+        except:
+            pass
+
+        # 보관된 백업 기록에서 복원
+        backup_generations = list_backup_generations()
+        if backup_generations:
+            with st.expander(f"🕘 백업 기록 ({len(backup_generations)}개)", expanded=False):
+                selected_generation = st.selectbox(
+                    "복원할 백업 시점",
+                    backup_generations,
+                    format_func=lambda name: datetime.strptime(name, '%Y%m%d_%H%M%S_%f').strftime('%Y-%m-%d %H:%M:%S')
+                )
+                if st.button("↩️ 이 시점으로 복원", use_container_width=True):
+                    try:
+                        backup_data = json.loads(read_backup_generation(selected_generation))
+                        conn = get_connection()
+                        cursor = conn.cursor()
+                        restore_backup_data(cursor, backup_data)
+                        conn.commit()
+                        conn.close()
+                        backup_to_json()
+                        invalidate_shared_cache()
+                        st.success("✅ 데이터 복원 완료!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ 복원 중 오류가 발생했습니다: {str(e)}")
+
+        # CSV / Parquet 대량 가져오기 (기존 데이터 유지, 병합)
+        with st.expander("📥 CSV / Parquet 기록 가져오기", expanded=False):
+            st.caption("기존 데이터는 그대로 두고 새 기록만 추가합니다. 원두는 이름과 구매처로 찾거나 새로 등록됩니다.")
+            import_file = st.file_uploader("기록 파일 선택", type=['csv', 'parquet'], key="import_file")
+            if import_file is not None and st.button("📥 가져오기 실행", use_container_width=True):
+                file_type = 'parquet' if import_file.name.lower().endswith('.parquet') else 'csv'
+                progress_bar = st.progress(0.0, text="가져오는 중...")
+
+                def update_progress(fraction, processed, inserted):
+                    text = f"처리 {processed:,}행 | 추가 {inserted:,}건"
+                    progress_bar.progress(fraction if fraction is not None else 0.0, text=text)
+
+                try:
+                    summary = import_brewing_records(import_file, file_type, progress_callback=update_progress)
+                    progress_bar.progress(1.0, text="완료")
+                    backup_to_json()
+                    invalidate_shared_cache()
+                    st.success(f"✅ 가져오기 완료! 처리 {summary['processed']:,}행 | 추가 {summary['inserted']:,}건 | "
+                               f"중복/제외 {summary['skipped']:,}건 | 새 원두 {summary['new_beans']}개")
+                except Exception as e:
+                    st.error(f"❌ 가져오기 중 오류가 발생했습니다: {str(e)}")
+
+        # 오래된 기록 보관 (최근 기록만 평소 조회에 사용, 통계 집계와 백업에는 계속 포함)
+        with st.expander("🗄️ 오래된 기록 보관", expanded=False):
+            archive_summary = get_archive_summary()
+            if archive_summary['count']:
+                st.caption(f"보관된 기록 {archive_summary['count']:,}개 "
+                           f"({archive_summary['first_date']} ~ {archive_summary['last_date']})")
+            conn = get_connection()
+            archive_max_age = get_archive_max_age(conn.cursor())
+            conn.close()
+            max_age_days = st.number_input(
+                "보관 기준 (일)", min_value=30, max_value=3650, step=30,
+                value=archive_max_age or ARCHIVE_DEFAULT_MAX_AGE_DAYS,
+                help="추출한 지 이 기간이 지난 기록을 보관 DB로 옮깁니다"
+            )
+            auto_archive = st.checkbox("앱 시작 시 자동으로 보관", value=archive_max_age is not None)
+            if st.button("🗄️ 지금 보관하기", use_container_width=True):
+                set_archive_max_age(max_age_days if auto_archive else None)
+                moved = archive_old_records(max_age_days)
+                invalidate_shared_cache()
+                st.success(f"✅ {moved:,}개의 기록을 보관했습니다.")
+
     elif menu == "• 원두 등록":
         st.header("• 새 원두 등록")
         
@@ -774,18 +2697,8 @@ def main():
                     
                     if add_pour:
                         # 마지막 시간을 기준으로 30초 후 시간 계산
-                        last_time = st.session_state.pour_schedule[-1]['time']
-                        try:
-                            if ':' in last_time:
-                                minutes, seconds = map(int, last_time.split(':'))
-                                total_seconds = minutes * 60 + seconds + 30
-                                new_minutes = total_seconds // 60
-                                new_seconds = total_seconds % 60
-                                new_time = f"{new_minutes}:{new_seconds:02d}"
-                            else:
-                                new_time = "0:30"
-                        except:
-                            new_time = "0:30"
+                        last_seconds = parse_duration(st.session_state.pour_schedule[-1]['time'])
+                        new_time = format_duration(last_seconds + 30) if last_seconds is not None else "0:30"
                         
                         st.session_state.pour_schedule.append({
                             'water_amount': 60,
@@ -892,10 +2805,19 @@ def main():
     elif menu == "📊 추출 기록 보기":
         st.header("📊 추출 기록 보기")
         
-        beans_df = get_beans()
-        brewing_records_df = get_brewing_records()
+        beans_df = shared_read('beans')
         
-        if brewing_records_df.empty:
+        # 보관된 기록은 요청할 때만 함께 조회
+        include_archive = False
+        archive_summary = get_archive_summary()
+        if archive_summary['count']:
+            include_archive = st.toggle(
+                f"🗄️ 보관된 기록 포함 ({archive_summary['count']:,}개, ~{archive_summary['last_date']})",
+                help="오래되어 보관 DB로 옮긴 기록까지 전체 기록을 조회합니다"
+            )
+        
+        # 기록 유무는 집계 테이블로 확인 (필터를 정한 뒤 한 번만 조회)
+        if shared_read('score_summary', 'all').empty:
             st.info("🔍 아직 추출 기록이 없습니다.")
             return
         
@@ -906,28 +2828,64 @@ def main():
             help="특정 원두의 기록만 보고 싶다면 선택하세요"
         )
         
+        # 추출 시간 범위 필터 (brew_time_seconds 인덱스 범위 조회)
+        brew_time_range = None
+        min_seconds, max_seconds = get_brew_time_bounds(include_archive)
+        if min_seconds is not None and max_seconds > min_seconds:
+            selected_range = st.slider(
+                "⏱️ 추출 시간 범위 (초)", min_value=int(min_seconds), max_value=int(max_seconds),
+                value=(int(min_seconds), int(max_seconds)), step=5,
+                help="총 추출 시간이 이 범위에 있는 기록만 표시합니다"
+            )
+            if selected_range != (int(min_seconds), int(max_seconds)):
+                brew_time_range = selected_range
+        
+        selected_bean_id = None
         if bean_filter != "전체 기록 보기":
             selected_bean_id = beans_df[beans_df['name'] == bean_filter]['id'].iloc[0]
-            filtered_records = get_brewing_records(selected_bean_id)
-        else:
-            filtered_records = brewing_records_df
+        filtered_records = shared_read('brewing_records', selected_bean_id, brew_time_range, include_archive)
         
         st.write(f"📈 **총 {len(filtered_records)}개의 기록**")
         
+        # 여러 기록 한 번에 삭제 (한 트랜잭션, 백업 한 번)
+        if not filtered_records.empty:
+            with st.expander("🗑️ 기록 여러 개 삭제"):
+                record_labels = {
+                    int(record['id']): f"{record['bean_name']} - {record['brew_date']} ⭐{record['overall_score']}/5"
+                    for _, record in filtered_records.iterrows()
+                }
+                selected_record_ids = st.multiselect(
+                    "삭제할 기록", list(record_labels.keys()), format_func=lambda record_id: record_labels[record_id],
+                    key="bulk_delete_records"
+                )
+                if selected_record_ids:
+                    confirm_bulk = st.checkbox(f"기록 {len(selected_record_ids)}개 삭제를 확인합니다", key="confirm_bulk_delete_records")
+                    if st.button(f"🗑️ 선택한 {len(selected_record_ids)}개 삭제", disabled=not confirm_bulk, use_container_width=True):
+                        delete_brewing_records(selected_record_ids)
+                        del st.session_state["bulk_delete_records"]
+                        del st.session_state["confirm_bulk_delete_records"]
+                        st.rerun()
+        
+        # 한 번에 보여줄 기록 수 (텍스트 컬럼은 현재 페이지의 기록만 읽음)
+        page_records = filtered_records
+        if len(filtered_records) > RECORDS_PAGE_SIZE:
+            page_count = (len(filtered_records) - 1) // RECORDS_PAGE_SIZE + 1
+            page = st.number_input(f"📄 페이지 (총 {page_count}쪽)", min_value=1, max_value=page_count, value=1, step=1)
+            page_records = filtered_records.iloc[(page - 1) * RECORDS_PAGE_SIZE:page * RECORDS_PAGE_SIZE]
+        page_records = page_records.join(get_record_texts(page_records['id'], include_archive), on='id')
+        
         # 기록 표시 (모바일 최적화)
-        for _, record in filtered_records.iterrows():
-            # Brewing ratio 계산
+        for _, record in page_records.iterrows():
+            # Brewing ratio (SQL에서 계산)
             total_pour_water = 0
             brewing_ratio_text = ""
+            if pd.notna(record['brewing_ratio']):
+                brewing_ratio_text = f" | 📊 1:{record['brewing_ratio']:.1f}"
             
             if record.get('pour_schedule'):
                 try:
                     pour_schedule = json.loads(record['pour_schedule'])
                     total_pour_water = sum([pour['water_amount'] for pour in pour_schedule])
-                    total_water = total_pour_water + (record.get('adding_water', 0) or 0)
-                    if record['coffee_amount'] > 0:
-                        brewing_ratio = total_water / record['coffee_amount']
-                        brewing_ratio_text = f" | 📊 1:{brewing_ratio:.1f}"
                 except:
                     pass
             
@@ -1004,75 +2962,60 @@ def main():
     elif menu == "📈 통계":
         st.header("📈 통계 및 분석")
         
-        brewing_records_df = get_brewing_records()
-        beans_df = get_beans()
+        # 통계는 원본 기록 대신 일별 집계 테이블(daily_rollups)에서 계산
+        bean_scores = shared_read('score_summary', 'bean')
+        beans_df = shared_read('beans')
         
-        if brewing_records_df.empty:
+        if bean_scores.empty:
             st.info("📊 통계를 표시할 데이터가 없습니다.")
             return
         
+        total_brews = int(bean_scores['brew_count'].sum())
+        
         # 요약 통계 (모바일 최적화)
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("☕ 총 추출 횟수", len(brewing_records_df))
-            avg_score = brewing_records_df['overall_score'].mean()
+            st.metric("☕ 총 추출 횟수", total_brews)
+            avg_score = bean_scores['overall_sum'].sum() / max(bean_scores['scored_count'].sum(), 1)
             st.metric("⭐ 평균 만족도", f"{avg_score:.1f}/5")
         
+        # 최고 원두는 단순 평균이 아닌 축소 평균으로 (추출이 적은 원두의 우연한 고득점 방지)
+        data_version = get_data_version()
+        bean_intervals = get_score_intervals('bean', data_version)
         with col2:
             st.metric("• 등록된 원두", len(beans_df))
-            if len(brewing_records_df) > 0:
-                best_bean = brewing_records_df.groupby('bean_name')['overall_score'].mean().idxmax()
-                st.metric("🏆 최고 원두", best_bean)
+            if not bean_intervals.empty:
+                best = bean_intervals.iloc[0]
+                st.metric("🏆 최고 원두", best['bean_name'],
+                          help=f"축소 평균 {best['shrunk_mean']:.2f} | 평균 {best['mean']:.2f} "
+                               f"({analytics.CONFIDENCE:.0%} 신뢰구간 {best['ci_low']:.2f}~{best['ci_high']:.2f}, "
+                               f"{int(best['brew_count'])}회)")
         
         st.markdown("---")
         
-        # 차트들 (모바일에서는 세로로 배치)
-        # 만족도 분포
-        fig = px.histogram(brewing_records_df, x='overall_score', 
-                         title='📊 전체 만족도 분포', 
-                         nbins=5, range_x=[0.5, 5.5])
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # 원두별 평균 점수
-        bean_scores = brewing_records_df.groupby('bean_name')['overall_score'].mean().reset_index()
-        fig = px.bar(bean_scores, x='bean_name', y='overall_score',
-                    title='• 원두별 평균 만족도')
-        fig.update_xaxes(tickangle=45)
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # 추출 방법별 만족도
-        method_scores = brewing_records_df.groupby('method')['overall_score'].mean().reset_index()
-        fig = px.bar(method_scores, x='method', y='overall_score',
-                    title='🎯 추출 방법별 평균 만족도')
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # 추출 도구별 만족도
-        if 'equipment' in brewing_records_df.columns and brewing_records_df['equipment'].notna().any():
-            equipment_scores = brewing_records_df.dropna(subset=['equipment']).groupby('equipment')['overall_score'].mean().reset_index()
-            if not equipment_scores.empty:
-                fig = px.bar(equipment_scores, x='equipment', y='overall_score',
-                            title='🛠️ 추출 도구별 평균 만족도')
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # 원두별 추출 횟수
-        bean_counts = brewing_records_df['bean_name'].value_counts().reset_index()
-        bean_counts.columns = ['bean_name', 'count']
-        fig = px.pie(bean_counts, values='count', names='bean_name',
-                    title='• 원두별 추출 횟수')
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        # 차트는 패널을 열 때만 만들고, 데이터가 그대로면 캐시된 spec을 그대로 사용
+        st.caption("보고 싶은 차트를 열어주세요")
+        for idx, (chart_name, (title, _)) in enumerate(STATS_CHARTS.items()):
+            if st.toggle(title, value=idx == 0, key=f"stats_panel_{chart_name}"):
+                chart_spec = get_stats_chart_spec(chart_name, data_version)
+                if chart_spec is None:
+                    st.info("표시할 데이터가 없습니다.")
+                else:
+                    st.plotly_chart(chart_spec, use_container_width=True)
         
-        # 시간별 만족도 추이
-        if len(brewing_records_df) > 1:
-            brewing_records_df['brew_date'] = pd.to_datetime(brewing_records_df['brew_date'])
-            fig = px.line(brewing_records_df, x='brew_date', y='overall_score',
-                         color='bean_name', title='📈 시간별 만족도 추이', markers=True)
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+        # 다이얼링: 분쇄도/비율/물 온도 조합별 평균 만족도
+        if st.toggle("🗺️ 분쇄도 × 비율 × 온도 히트맵", key="stats_panel_heatmaps"):
+            bean_names = dict(zip(beans_df['id'].astype(int), beans_df['name']))
+            heatmap_bean_id = st.selectbox(
+                "원두 선택", [None] + list(bean_names.keys()),
+                format_func=lambda bean_id: "전체 원두" if bean_id is None else bean_names[bean_id],
+                key="heatmap_bean"
+            )
+            heatmap_specs = get_brew_parameter_heatmaps(heatmap_bean_id, data_version)
+            if not heatmap_specs:
+                st.info("히트맵을 그리려면 분쇄도/비율/온도가 입력된 기록이 2개 이상 필요합니다.")
+            for heatmap_spec in heatmap_specs:
+                st.plotly_chart(heatmap_spec, use_container_width=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
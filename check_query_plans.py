@@ -0,0 +1,135 @@
+"""조회 쿼리 실행 계획 검사 (EXPLAIN QUERY PLAN)
+
+사용법:
+    python check_query_plans.py
+    python check_query_plans.py --rows 20000 --verbose
+
+임시 DB에 가짜 추출 기록을 만들고 app.QUERIES의 모든 쿼리를 EXPLAIN QUERY PLAN으로
+확인합니다. 큰 테이블(추출 기록, 푸어 단계)을 전체 스캔하거나(인덱스 순서로 읽는 SCAN,
+한쪽만 열린 범위의 SEARCH 포함) 임시 B-tree로 정렬/그룹화하는 쿼리가 있으면 계획을 출력하고
+종료 코드 1로 끝납니다.
+일부러 전체를 읽는 쿼리는 ALLOWED_PLANS에 이유와 함께 적어 둡니다.
+
+{records} 자리는 brewing_records로 채워서 검사합니다.
+(보관된 기록을 합친 UNION ALL 계획은 검사하지 않음, archive.* 쿼리용으로 빈 보관 DB만 붙임)
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+import app
+from sample_data import build_database
+
+# 큰 테이블 이름과 쿼리에서 쓰는 별칭
+LARGE_TABLES = {'brewing_records', 'br', 'pour_steps', 'ps'}
+
+# 쿼리 이름 -> {허용할 문제: 이유}
+ALLOWED_PLANS = {
+    'brewing_records': {
+        'full_scan': "기록 페이지 기본 목록은 최근 기록 전체 (작은 dtype, 데이터 버전별로 공유 캐시에서 재사용)",
+    },
+    'brew_time_counts': {
+        'full_scan': "추출 시간 차트는 전체 기록의 초 단위 집계가 필요함 (인덱스 순서로 묶음, 차트는 데이터 버전별로 캐시됨)",
+    },
+    'freshness_counts': {
+        'full_scan': "경과일 차트는 원두 x 경과일 전체 집계가 필요함 (커버링 인덱스 순서로 묶음, 차트는 데이터 버전별로 캐시됨)",
+    },
+    'archive_count': {
+        'full_scan': "보관 DB 요약(sync_meta)을 처음 만들 때 한 번만 셈 (이후로는 옮길 때마다 증감)",
+    },
+    'score_intervals_bean': {
+        'full_scan': "bootstrap 신뢰구간은 전체 점수가 필요함 (데이터 버전별로 캐시됨)",
+    },
+    'brewing_records_by_brew_time': {
+        'temp_btree': "추출 시간 범위 인덱스로 찾은 뒤 날짜순 정렬 (범위 조건과 날짜 정렬을 한 인덱스로 만족할 수 없음)",
+    },
+    'score_summary_date_by_bean': {
+        'temp_btree': "원두 하나의 일별 집계 행만 날짜순 정렬 (daily_rollups는 기록 수가 아닌 일 수에 비례)",
+    },
+    'score_intervals_method': {
+        'full_scan': "bootstrap 신뢰구간은 전체 점수가 필요함 (데이터 버전별로 캐시됨)",
+    },
+    'score_intervals_equipment': {
+        'full_scan': "bootstrap 신뢰구간은 전체 점수가 필요함 (데이터 버전별로 캐시됨)",
+    },
+    'brew_parameter_grid': {
+        'full_scan': "히트맵 격자는 전체 기록의 추출 변수가 필요함 (데이터 버전별로 캐시됨)",
+    },
+    'backup_records': {
+        'full_scan': "JSON 백업은 전체 기록을 내보냄",
+    },
+}
+
+
+def plan_problems(detail):
+    """계획 한 줄에서 문제 종류를 찾음 ('full_scan', 'temp_btree')"""
+    problems = []
+    # 인덱스 순서로 읽어도(USING INDEX / COVERING INDEX) SCAN은 테이블 전체를 읽음 (SEARCH만 범위 조회)
+    match = re.match(r'SCAN (\S+)', detail)
+    if match and match.group(1).split('.')[-1] in LARGE_TABLES:
+        problems.append('full_scan')
+    # 한쪽만 열린 범위 하나(IS NOT NULL 등에서 나온 col>?)로 찾으면 사실상 전체를 읽음
+    match = re.match(r'SEARCH (\S+) .*\(\w+[<>]=?\?\)', detail)
+    if match and match.group(1).split('.')[-1] in LARGE_TABLES:
+        problems.append('full_scan')
+    if 'USE TEMP B-TREE' in detail:
+        problems.append('temp_btree')
+    return problems
+
+
+def explain(conn, sql):
+    params = [1] * sql.count('?')
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_queries(conn, verbose=False):
+    """모든 쿼리를 검사해서 실패한 쿼리 이름 목록을 반환"""
+    failures = []
+    for name in app.QUERIES:
+        plan = explain(conn, app.query_sql(name))
+        allowed = ALLOWED_PLANS.get(name, {})
+        problems = sorted({problem for detail in plan for problem in plan_problems(detail)})
+        unexpected = [problem for problem in problems if problem not in allowed]
+        status = '실패' if unexpected else ('허용' if problems else '통과')
+        print(f"[{status}] {name}")
+        if unexpected or verbose:
+            for detail in plan:
+                print(f"    {detail}")
+        for problem in problems:
+            if problem in allowed:
+                print(f"    허용 ({problem}): {allowed[problem]}")
+        if unexpected:
+            failures.append(name)
+    # 없어진 쿼리에 대한 허용 항목은 정리하도록 알려줌
+    for name in sorted(set(ALLOWED_PLANS) - set(app.QUERIES)):
+        print(f"[경고] ALLOWED_PLANS에 있지만 QUERIES에 없는 쿼리: {name}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="조회 쿼리 실행 계획 검사")
+    parser.add_argument('--rows', type=int, default=20_000, help="만들 추출 기록 수")
+    parser.add_argument('--verbose', action='store_true', help="통과한 쿼리의 계획도 출력")
+    args = parser.parse_args()
+
+    source_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        build_database(args.rows)
+        conn = app.get_connection(attach_archive=True)
+        app.ensure_archive_schema(conn.cursor())
+        failures = check_queries(conn, args.verbose)
+        conn.close()
+        os.chdir(source_dir)
+
+    print()
+    if failures:
+        print(f"실행 계획 검사 실패: {len(failures)}개 ({', '.join(failures)})")
+        sys.exit(1)
+    print(f"쿼리 {len(app.QUERIES)}개 모두 통과")
+
+
+if __name__ == "__main__":
+    main()
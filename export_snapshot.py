@@ -0,0 +1,289 @@
+"""통계 대시보드 정적 HTML 스냅샷 내보내기 (앱 없이 공유용)
+
+사용법:
+    python export_snapshot.py
+    python export_snapshot.py --output snapshot --full
+
+홈 요약(index.html), 원두별 페이지(beans/<id>.html), 📈 통계 차트 전체(stats.html)를
+미리 집계한 데이터와 plotly.js를 함께 넣은 정적 HTML 묶음으로 만듭니다.
+서버 없이 폴더째 보내거나 웹 서버에 올려서 볼 수 있습니다.
+
+manifest.json에 페이지별 입력 fingerprint를 저장해 두고, 다음 실행 때는
+바뀐 원두 페이지만 다시 만듭니다. 홈/통계 페이지는 데이터 버전이 바뀌었을 때만 다시 만들고,
+아무것도 바뀌지 않았으면 DB만 잠깐 읽고 끝나므로 cron으로 자주 돌려도 됩니다.
+(--full이면 전부 다시 생성)
+"""
+import argparse
+from datetime import datetime
+import hashlib
+import html
+import json
+import os
+
+import pandas as pd
+import plotly.express as px
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+
+import app
+
+SNAPSHOT_FORMAT = 1              # 페이지 구성이 바뀌면 올려서 전체를 다시 생성
+RECENT_RECORDS = 20              # 원두 페이지에 보여줄 최근 추출 기록 수
+MANIFEST_NAME = 'manifest.json'
+PLOTLY_JS_PATH = 'assets/plotly.min.js'
+
+PAGE_CSS = """
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Helvetica Neue', Arial, sans-serif,
+       'Apple Color Emoji', 'Segoe UI Emoji'; margin: 0; background: #fafafa; color: #333; }
+main { max-width: 960px; margin: 0 auto; padding: 1rem; }
+nav { margin-bottom: 1rem; } nav a { color: #8B4513; text-decoration: none; font-weight: bold; }
+.metrics { display: flex; flex-wrap: wrap; gap: 1rem; margin: 1rem 0; }
+.metric { flex: 1 1 140px; padding: 0.8rem 1rem; background: #fff; border-radius: 10px; border: 1px solid #eee; }
+.metric .label { color: #666; font-size: 0.9rem; } .metric .value { font-size: 1.6rem; font-weight: bold; }
+.coffee-card { display: block; padding: 1.2rem 1.5rem; border: 2px solid #ddd; border-radius: 15px; margin-bottom: 1rem;
+               background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%); box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+               color: inherit; text-decoration: none; }
+.coffee-card h4 { margin: 0; color: #8B4513; font-size: 1.3rem; } .coffee-card p { margin: 0.3rem 0; color: #666; }
+.card-footer { display: flex; justify-content: space-between; margin-top: 0.6rem; }
+.chart { min-height: 400px; margin-bottom: 1.5rem; }
+table { border-collapse: collapse; width: 100%; background: #fff; font-size: 0.9rem; }
+th, td { border-bottom: 1px solid #eee; padding: 0.4rem; text-align: left; vertical-align: top; }
+footer { margin-top: 2rem; color: #999; font-size: 0.8rem; }
+"""
+
+
+def render_page(title, body, root=''):
+    """공통 레이아웃 (root는 index.html 기준 상대 경로)"""
+    return f"""<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)}</title>
+<script src="{root}{PLOTLY_JS_PATH}"></script>
+<style>{PAGE_CSS}</style>
+</head>
+<body>
+<main>
+<nav><a href="{root}index.html">🏠 홈</a> · <a href="{root}stats.html">📈 통계</a></nav>
+<h1>{html.escape(title)}</h1>
+{body}
+<footer>스냅샷 생성: {datetime.now().strftime('%Y-%m-%d %H:%M')}</footer>
+</main>
+</body>
+</html>
+"""
+
+
+def render_metrics(metrics):
+    items = ''.join(f'<div class="metric"><div class="label">{html.escape(label)}</div>'
+                    f'<div class="value">{html.escape(str(value))}</div></div>' for label, value in metrics)
+    return f'<div class="metrics">{items}</div>'
+
+
+def render_chart(spec, div_id):
+    """미리 만든 차트 spec을 페이지에 넣음 (데이터가 없으면 안내 문구)"""
+    if spec is None:
+        return '<p>표시할 데이터가 없습니다.</p>'
+    spec_json = json.dumps(spec, cls=PlotlyJSONEncoder, ensure_ascii=False).replace('</', '<\\/')
+    return (f'<div id="{div_id}" class="chart"></div>\n'
+            f'<script>(function () {{ var spec = {spec_json}; '
+            f'Plotly.newPlot("{div_id}", spec.data, spec.layout, {{responsive: true}}); }})();</script>')
+
+
+def format_score(value):
+    return f"{value:.1f}/5" if pd.notna(value) else "-"
+
+
+def text_or(value, default='미입력'):
+    return html.escape(str(value)) if pd.notna(value) and value != '' else default
+
+
+def build_index_page(beans_df, bean_summary, overall_summary):
+    overall = overall_summary.iloc[0] if not overall_summary.empty else None
+    body = render_metrics([
+        ("등록된 원두", len(beans_df)),
+        ("총 추출 횟수", int(overall['brew_count']) if overall is not None else 0),
+        ("평균 만족도", format_score(overall['overall_score']) if overall is not None else "-"),
+    ])
+    cards = []
+    for _, bean in beans_df.iterrows():
+        if bean['id'] in bean_summary.index:
+            brew_count = int(bean_summary.at[bean['id'], 'brew_count'])
+            last_brew = bean_summary.at[bean['id'], 'last_brew_date'] or "없음"
+        else:
+            brew_count, last_brew = 0, "없음"
+        cards.append(f"""<a class="coffee-card" href="beans/{int(bean['id'])}.html">
+<h4>☕ {html.escape(bean['name'])}</h4>
+<p><strong>🏪 구매처:</strong> {text_or(bean['shop'])}</p>
+<p><strong>🌱 품종:</strong> {text_or(bean['variety'])}</p>
+<p><strong>🔥 로스팅:</strong> {text_or(bean['roast_date'])}</p>
+<div class="card-footer"><span>☕ {brew_count}회 추출</span><span>📅 {html.escape(str(last_brew))}</span></div>
+</a>""")
+    body += '<h2>등록된 원두 목록</h2>\n' + ('\n'.join(cards) or '<p>아직 등록된 원두가 없습니다.</p>')
+    return render_page("커피 추출 기록", body)
+
+
+def build_stats_page(data_version):
+    bean_scores = app.get_score_summary('bean')
+    total_brews = int(bean_scores['brew_count'].sum()) if not bean_scores.empty else 0
+    avg_score = bean_scores['overall_sum'].sum() / max(bean_scores['scored_count'].sum(), 1) if total_brews else None
+    metrics = [("☕ 총 추출 횟수", total_brews), ("⭐ 평균 만족도", format_score(avg_score))]
+    bean_intervals = app.get_score_intervals('bean', data_version)
+    if not bean_intervals.empty:
+        best = bean_intervals.iloc[0]
+        metrics.append(("🏆 최고 원두", f"{best['bean_name']} ({best['shrunk_mean']:.2f})"))
+    body = render_metrics(metrics)
+    for chart_name, (title, _) in app.STATS_CHARTS.items():
+        body += f'<h2>{html.escape(title)}</h2>\n'
+        body += render_chart(app.get_stats_chart_spec(chart_name, data_version), f'chart_{chart_name}') + '\n'
+    body += '<h2>🗺️ 분쇄도 × 비율 × 온도 히트맵</h2>\n'
+    heatmap_specs = app.get_brew_parameter_heatmaps(None, data_version)
+    body += '\n'.join(render_chart(spec, f'heatmap_{i}') for i, spec in enumerate(heatmap_specs)) or \
+        '<p>히트맵을 그리려면 분쇄도/비율/온도가 입력된 기록이 2개 이상 필요합니다.</p>'
+    return render_page("📈 통계 및 분석", body)
+
+
+def build_bean_page(bean, data_version):
+    """원두 하나의 페이지 (다른 원두 데이터에 영향받는 내용은 넣지 않음)"""
+    bean_id = int(bean['id'])
+    summary = app.get_score_summary('all', bean_id)
+    summary = summary.iloc[0] if not summary.empty else None
+    body = render_metrics([
+        ("추출 횟수", int(summary['brew_count']) if summary is not None else 0),
+        ("평균 만족도", format_score(summary['overall_score']) if summary is not None else "-"),
+        ("마지막 추출", (summary['last_brew_date'] if summary is not None else None) or "없음"),
+    ])
+    body += (f"<p><strong>🏪 구매처:</strong> {text_or(bean['shop'])} · <strong>🌱 품종:</strong> "
+             f"{text_or(bean['variety'])} · <strong>🔥 로스팅:</strong> {text_or(bean['roast_date'])}</p>")
+    if pd.notna(bean['notes']) and bean['notes']:
+        body += f"<p>📝 {html.escape(bean['notes'])}</p>"
+
+    daily_scores = app.get_score_summary('date', bean_id).dropna(subset=['brew_date'])
+    if len(daily_scores) >= 2:
+        daily_scores['brew_date'] = pd.to_datetime(daily_scores['brew_date'])
+        fig = px.line(daily_scores, x='brew_date', y='overall_score', title='📈 날짜별 만족도', markers=True)
+        fig.update_layout(height=400)
+        body += render_chart(fig.to_plotly_json(), 'chart_daily')
+
+    method_scores = app.get_score_summary('method', bean_id).dropna(subset=['method'])
+    if not method_scores.empty:
+        rows = ''.join(f"<tr><td>{html.escape(row['method'])}</td><td>{int(row['brew_count'])}</td>"
+                       f"<td>{format_score(row['overall_score'])}</td></tr>" for _, row in method_scores.iterrows())
+        body += f"<h2>🎯 추출 방법별</h2><table><tr><th>방법</th><th>횟수</th><th>평균 만족도</th></tr>{rows}</table>"
+
+    for i, spec in enumerate(app.get_brew_parameter_heatmaps(bean_id, data_version)):
+        body += render_chart(spec, f'heatmap_{i}')
+
+    records = app.get_brewing_records(bean_id, include_archive=True).head(RECENT_RECORDS)
+    if not records.empty:
+        texts = app.get_record_texts(records['id'], include_archive=True)
+        records = records.join(texts, on='id')
+        rows = ''.join(
+            f"<tr><td>{text_or(row['brew_date'], '-')}</td><td>{text_or(row['method'], '-')}</td>"
+            f"<td>{text_or(row['grind_size'], '-')}</td><td>{text_or(row['water_temp'], '-')}</td>"
+            f"<td>{text_or(row['brew_time'], '-')}</td><td>{format_score(row['overall_score'])}</td>"
+            f"<td>{text_or(row['tasting_notes'], '')}</td></tr>" for _, row in records.iterrows())
+        body += (f"<h2>📋 최근 추출 기록</h2><table><tr><th>날짜</th><th>방법</th><th>분쇄도</th><th>물 온도</th>"
+                 f"<th>추출 시간</th><th>만족도</th><th>테이스팅 노트</th></tr>{rows}</table>")
+    return render_page(f"☕ {bean['name']}", body, root='../')
+
+
+def get_bean_fingerprints():
+    """원두별 페이지 입력 fingerprint (원두 정보, 기록 수, 최신 row_version으로 계산)"""
+    # DataFrame으로 읽으면 기록 없는 원두 하나 때문에 열 dtype이 float이 되어 다른 원두 값도 바뀌므로 행 그대로 읽음
+    conn = app.get_connection()
+    cursor = conn.cursor()
+    source = app.records_source(cursor, include_archive=True)
+    rows = cursor.execute(app.query_sql('snapshot_bean_fingerprints', source)).fetchall()
+    conn.close()
+    fingerprints = {}
+    for row in rows:
+        payload = json.dumps([SNAPSHOT_FORMAT] + list(row), default=str)
+        fingerprints[int(row[0])] = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def load_manifest(output, full):
+    path = os.path.join(output, MANIFEST_NAME)
+    if full or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    # 페이지 구성이 바뀌었으면 이전 manifest는 쓰지 않음
+    return manifest if manifest.get('format') == SNAPSHOT_FORMAT else {}
+
+
+def write_file(output, name, content):
+    """임시 파일에 쓴 뒤 교체 (생성 중에 열어도 반쯤 쓰인 페이지가 보이지 않도록)"""
+    path = os.path.join(output, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(path + '.tmp', path)
+
+
+def export_snapshot(output='snapshot', full=False):
+    """스냅샷을 만들고 {'beans': 다시 만든 원두 페이지 수, 'removed': 지운 페이지 수, 'site': 홈/통계 갱신 여부} 반환"""
+    app.init_database()
+    manifest = load_manifest(output, full)
+    previous_pages = manifest.get('pages', {})
+    data_version = app.get_data_version()
+
+    if not os.path.exists(os.path.join(output, PLOTLY_JS_PATH)):
+        write_file(output, PLOTLY_JS_PATH, get_plotlyjs())
+
+    # 원두 페이지: fingerprint가 바뀐 원두만 다시 생성
+    fingerprints = get_bean_fingerprints()
+    pages = {}
+    rebuilt = 0
+    changed_ids = [bean_id for bean_id, fingerprint in fingerprints.items()
+                   if previous_pages.get(f'beans/{bean_id}.html') != fingerprint
+                   or not os.path.exists(os.path.join(output, f'beans/{bean_id}.html'))]
+    if changed_ids:
+        beans_df = app.get_beans().set_index('id', drop=False)
+        for bean_id in changed_ids:
+            write_file(output, f'beans/{bean_id}.html', build_bean_page(beans_df.loc[bean_id], data_version))
+            rebuilt += 1
+    for bean_id, fingerprint in fingerprints.items():
+        pages[f'beans/{bean_id}.html'] = fingerprint
+
+    # 삭제된 원두 페이지 정리
+    removed = 0
+    for name in set(previous_pages) - set(pages):
+        path = os.path.join(output, name)
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    # 홈/통계: 전체 데이터에 따라 바뀌므로 데이터 버전이 바뀌었을 때만 다시 생성
+    site_changed = (manifest.get('data_version') != data_version
+                    or not all(os.path.exists(os.path.join(output, name)) for name in ('index.html', 'stats.html')))
+    if site_changed:
+        beans_df = app.get_beans()
+        bean_summary = app.get_score_summary('bean').set_index('bean_id')
+        write_file(output, 'index.html', build_index_page(beans_df, bean_summary, app.get_score_summary('all')))
+        write_file(output, 'stats.html', build_stats_page(data_version))
+
+    write_file(output, MANIFEST_NAME, json.dumps({
+        'format': SNAPSHOT_FORMAT,
+        'data_version': data_version,
+        'exported_at': datetime.now().isoformat(),
+        'pages': pages,
+    }, ensure_ascii=False, indent=2))
+    return {'beans': rebuilt, 'removed': removed, 'site': site_changed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="통계 대시보드를 정적 HTML 스냅샷으로 내보냅니다")
+    parser.add_argument('--output', default='snapshot', help="스냅샷을 만들 폴더")
+    parser.add_argument('--full', action='store_true', help="manifest를 무시하고 모든 페이지를 다시 생성")
+    args = parser.parse_args()
+
+    result = export_snapshot(args.output, args.full)
+    print(f"원두 페이지 {result['beans']}개 생성 | {result['removed']}개 삭제 | "
+          f"홈/통계 {'갱신' if result['site'] else '변경 없음'} → {os.path.join(args.output, 'index.html')}")
+
+
+if __name__ == "__main__":
+    main()
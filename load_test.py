@@ -0,0 +1,200 @@
+"""동시 접속 부하 테스트 (Streamlit AppTest 세션 여러 개를 동시에 실행)
+
+사용법:
+    python load_test.py
+    python load_test.py --sessions 8 --duration 60
+
+임시 폴더에 app.py와 data.json을 복사해서 실행하므로 실제 DB/백업 파일은 건드리지 않습니다.
+각 세션은 홈 보기, 추출 기록 저장(커핑 태그 클릭 포함), 통계 보기를 섞어서 반복하고,
+rerun 처리량(초당), 지연 시간 백분위, DB 잠금 오류 수를 출력합니다.
+
+AppTest는 실행할 때마다 프로세스 전역 Runtime을 바꿔 끼우므로 한 프로세스에서
+여러 세션을 동시에 돌릴 수 없습니다. 그래서 세션마다 프로세스를 하나씩 띄우고,
+같은 DB와 data.json을 함께 쓰게 해서 SQLite 잠금과 백업 쓰기 경합을 재현합니다.
+(st.cache_data 캐시는 세션(프로세스)끼리 공유되지 않음)
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_FILES = ['app.py', 'analytics.py', 'data.json']
+ACTION_WEIGHTS = {'home': 5, 'brew': 2, 'stats': 3}
+MENU_HOME = "🏠 홈"
+MENU_STATS = "📈 통계"
+
+
+class LoadStats:
+    """세션 하나의 측정값 (세션 프로세스가 끝나면 합쳐서 출력)"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.lock_errors = 0
+        self.other_errors = []
+
+    def record(self, action, seconds, at=None, error=None):
+        messages = [str(error)] if error else []
+        if at is not None:
+            messages += [str(e.value) for e in at.exception] + [e.value for e in at.error]
+        self.latencies[action].append(seconds)
+        for message in messages:
+            if 'locked' in message:
+                self.lock_errors += 1
+            else:
+                self.other_errors.append(message)
+
+    def as_dict(self):
+        # 세션 프로세스에서는 AppTest가 __main__을 앱 스크립트로 바꾸므로 클래스 대신 dict로 넘김
+        return {'latencies': dict(self.latencies), 'lock_errors': self.lock_errors,
+                'other_errors': self.other_errors}
+
+    def merge(self, other):
+        for action, values in other['latencies'].items():
+            self.latencies[action].extend(values)
+        self.lock_errors += other['lock_errors']
+        self.other_errors.extend(other['other_errors'])
+
+
+def timed_run(stats, action, at, step):
+    """위젯 조작(step) 후 rerun 한 번을 실행하고 지연 시간을 기록"""
+    start = time.perf_counter()
+    try:
+        step()
+        at.run()
+    except Exception as e:
+        stats.record(action, time.perf_counter() - start, error=e)
+        return False
+    stats.record(action, time.perf_counter() - start, at)
+    return True
+
+
+def select_menu(stats, action, at, page):
+    menu = at.selectbox[0]
+    if menu.value != page:
+        timed_run(stats, action, at, lambda: menu.select(page))
+
+
+def view_home(stats, at, rng):
+    select_menu(stats, 'home', at, MENU_HOME)
+    timed_run(stats, 'home', at, lambda: None)
+
+
+def view_stats(stats, at, rng):
+    select_menu(stats, 'stats', at, MENU_STATS)
+    panels = [toggle for toggle in at.toggle if toggle.key and toggle.key.startswith('stats_panel_')]
+    if panels:
+        panel = rng.choice(panels)
+        timed_run(stats, 'stats', at, lambda: panel.set_value(not panel.value))
+
+
+def submit_brew(stats, at, rng):
+    select_menu(stats, 'brew', at, MENU_HOME)
+    brew_buttons = [button for button in at.button if button.key and button.key.startswith('brew_')]
+    if not brew_buttons:
+        return
+    brew_button = rng.choice(brew_buttons)
+    if not timed_run(stats, 'brew', at, brew_button.click):
+        return
+    # 커핑 태그 몇 개 클릭 (클릭마다 rerun)
+    for _ in range(rng.randint(1, 3)):
+        tags = [button for button in at.button if button.key and button.key.startswith('tag_')]
+        if not tags:
+            break
+        tag = rng.choice(tags)
+        timed_run(stats, 'tag', at, tag.click)
+    save_buttons = [button for button in at.button if button.label == "💾 추출 기록 저장"]
+    if save_buttons:
+        timed_run(stats, 'brew', at, save_buttons[0].click)
+    select_menu(stats, 'brew', at, MENU_HOME)
+
+
+ACTIONS = {'home': view_home, 'brew': submit_brew, 'stats': view_stats}
+
+
+def run_session(workdir, deadline, seed, timeout):
+    """세션 프로세스: deadline(time.time 기준)까지 동작을 반복하고 측정값을 반환"""
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    rng = random.Random(seed)
+    stats = LoadStats()
+    at = AppTest.from_file(os.path.join(workdir, 'app.py'), default_timeout=timeout)
+    timed_run(stats, 'home', at, lambda: None)
+    names, weights = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+    while time.time() < deadline:
+        ACTIONS[rng.choices(names, weights)[0]](stats, at, rng)
+    return stats.as_dict()
+
+
+def prepare_workdir(workdir, source_dir):
+    for name in APP_FILES:
+        path = os.path.join(source_dir, name)
+        if os.path.exists(path):
+            shutil.copy(path, workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    import app
+    app.init_database()
+    conn = sqlite3.connect('coffee_tracker.db')
+    if conn.execute("SELECT COUNT(*) FROM beans").fetchone()[0] == 0:
+        conn.close()
+        app.save_bean("부하 테스트 원두", "테스트", "게이샤", "2024-01-01", "")
+    else:
+        conn.close()
+
+
+def count_records():
+    conn = sqlite3.connect('coffee_tracker.db')
+    count = conn.execute("SELECT COUNT(*) FROM brewing_records").fetchone()[0]
+    conn.close()
+    return count
+
+
+def report(stats, elapsed, sessions, saved):
+    all_latencies = np.concatenate([np.array(values) for values in stats.latencies.values()])
+    print(f"세션 {sessions}개 | {elapsed:.1f}초 | rerun {len(all_latencies):,}회 | "
+          f"{len(all_latencies) / elapsed:.2f} rerun/초 | 저장된 추출 기록 {saved}개")
+    print(f"{'동작':<8}{'횟수':>8}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for action, values in sorted(stats.latencies.items()) + [('전체', all_latencies)]:
+        p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+        print(f"{action:<8}{len(values):>8}{p50:>10.0f}{p90:>10.0f}{p99:>10.0f}{max(values) * 1000:>10.0f}")
+    print(f"DB 잠금 오류: {stats.lock_errors}회 | 기타 오류: {len(stats.other_errors)}회")
+    for message in sorted(set(stats.other_errors))[:5]:
+        print(f"  - {message[:200]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 앱 동시 접속 부하 테스트")
+    parser.add_argument('--sessions', type=int, default=4, help="동시에 실행할 세션 수")
+    parser.add_argument('--duration', type=float, default=30, help="측정 시간 (초)")
+    parser.add_argument('--timeout', type=float, default=60, help="rerun 한 번의 최대 대기 시간 (초)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, source_dir)
+        records_before = count_records()
+        stats = LoadStats()
+        start = time.time()
+        deadline = start + args.duration
+        with ProcessPoolExecutor(max_workers=args.sessions) as executor:
+            futures = [executor.submit(run_session, workdir, deadline, args.seed + i, args.timeout)
+                       for i in range(args.sessions)]
+            for future in futures:
+                stats.merge(future.result())
+        elapsed = time.time() - start
+        report(stats, elapsed, args.sessions, count_records() - records_before)
+        os.chdir(source_dir)
+
+
+if __name__ == "__main__":
+    main()
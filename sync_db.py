@@ -0,0 +1,36 @@
+"""두 커피 기록 DB 사이의 변경분 동기화
+
+사용법:
+    python sync_db.py 다른기기.db
+    python sync_db.py 다른기기.db --local coffee_tracker.db
+
+마지막 동기화 이후 바뀐 원두/추출 기록/삭제 기록만 양방향으로 주고받습니다.
+같은 행이 양쪽에서 바뀌었으면 updated_at이 늦은 쪽이 이깁니다.
+"""
+import argparse
+import os
+
+from app import backup_to_json, sync_databases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="두 커피 기록 DB의 변경분을 동기화합니다")
+    parser.add_argument('peer', help="동기화할 상대 DB 파일 경로")
+    parser.add_argument('--local', default='coffee_tracker.db', help="이 기기의 DB 파일 경로")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.peer):
+        parser.error(f"DB 파일을 찾을 수 없습니다: {args.peer}")
+
+    result = sync_databases(args.peer, args.local)
+    for direction, label in (('sent', '보냄'), ('received', '받음')):
+        summary = result[direction]
+        print(f"{label}: 원두 {summary['beans']}개 | 기록 {summary['brewing_records']}개 | 삭제 {summary['deleted']}개")
+
+    # 기본 DB가 바뀌었으면 data.json 백업도 갱신
+    if args.local == 'coffee_tracker.db' and any(result['received'].values()):
+        backup_to_json()
+
+
+if __name__ == "__main__":
+    main()
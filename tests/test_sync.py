@@ -0,0 +1,78 @@
+"""같은 백업(data.json)에서 시작한 두 기기의 동기화 테스트"""
+import json
+import os
+import sqlite3
+
+import pytest
+
+import app
+
+# uid/updated_at이 없는 이전 버전의 백업
+LEGACY_DATA = {
+    'beans': [
+        {'id': 1, 'name': '에티오피아 예가체프', 'shop': '동네 로스터리', 'variety': '헤어룸',
+         'roast_date': '2024-11-01', 'notes': '', 'created_date': '2024-11-02 09:00:00'},
+    ],
+    'brewing_records': [
+        {'id': 1, 'bean_id': 1, 'brew_date': '2024-11-05', 'grind_size': '20', 'coffee_amount': 18,
+         'water_amount': 280, 'water_temp': 92, 'brew_time': '2:30', 'method': '드립',
+         'equipment': '하리오 V60', 'adding_water': 0, 'pour_schedule': None, 'taste_score': 4,
+         'aroma_score': 4, 'body_score': 3, 'acidity_score': 4, 'overall_score': 4,
+         'tasting_notes': '', 'improvements': ''},
+    ],
+}
+
+
+@pytest.fixture
+def devices(tmp_path, monkeypatch):
+    """같은 data.json으로 처음 시작한 두 기기의 DB 경로"""
+    paths = []
+    for name in ('a', 'b'):
+        device_dir = tmp_path / name
+        device_dir.mkdir()
+        (device_dir / 'data.json').write_text(json.dumps(LEGACY_DATA, ensure_ascii=False), encoding='utf-8')
+        monkeypatch.chdir(device_dir)
+        app.init_database()
+        paths.append(str(device_dir / 'coffee_tracker.db'))
+    return paths
+
+
+def _save_same_brew(db_path, monkeypatch):
+    """기기에서 같은 날 같은 레시피로 새 추출 기록을 저장"""
+    monkeypatch.chdir(os.path.dirname(db_path))
+    app.save_brewing_record(1, '2024-11-06', '20', 18, 92, '2:30', '드립', '하리오 V60', 0, None,
+                            4, 4, 3, 4, 4, '', '')
+
+
+def _rows(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+
+def test_restored_rows_get_same_uids(devices):
+    local, peer = devices
+    for sql in ("SELECT id, uid FROM beans ORDER BY id", "SELECT id, uid FROM brewing_records ORDER BY id"):
+        assert _rows(local, sql) == _rows(peer, sql)
+
+
+def test_first_sync_does_not_duplicate(devices):
+    local, peer = devices
+    app.sync_databases(peer, local)
+    for db_path in (local, peer):
+        assert _rows(db_path, "SELECT COUNT(*) FROM beans") == [(1,)]
+        assert _rows(db_path, "SELECT COUNT(*) FROM brewing_records") == [(1,)]
+        assert _rows(db_path, "SELECT SUM(brew_count) FROM daily_rollups") == [(1,)]
+
+
+def test_new_records_on_both_devices_are_kept(devices, monkeypatch):
+    # 두 기기 모두 다음 id(2)로 같은 내용을 저장해도 서로 다른 추출이므로 둘 다 남아야 함
+    local, peer = devices
+    for db_path in devices:
+        _save_same_brew(db_path, monkeypatch)
+    assert _rows(local, "SELECT id FROM brewing_records ORDER BY id") == _rows(peer, "SELECT id FROM brewing_records ORDER BY id")
+    app.sync_databases(peer, local)
+    for db_path in (local, peer):
+        assert _rows(db_path, "SELECT COUNT(*) FROM brewing_records") == [(3,)]
+        assert _rows(db_path, "SELECT SUM(brew_count) FROM daily_rollups") == [(3,)]